@@ -6,15 +6,22 @@ Fetches Reddit posts, de-duplicates, scores sentiment with FinBERT,
 and saves to CSV. Designed to run as Kubernetes CronJob.
 """
 
+import csv
 import logging
 import os
+import queue
 import signal
 import sys
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
 
+import numpy as np
 import pandas as pd
 import praw
 import psutil
@@ -24,13 +31,13 @@ from dotenv import load_dotenv
 try:
     from .dedup import PostDeduplicator
     from .metrics import MetricsServer, get_metrics
-    from .sentiment import FinBERTSentimentAnalyzer
+    from .sentiment import RESULT_FIELDS, FinBERTSentimentAnalyzer
 except ImportError:
     # Fallback for standalone execution
     sys.path.append(str(Path(__file__).parent))
     from dedup import PostDeduplicator
     from metrics import MetricsServer, get_metrics
-    from sentiment import FinBERTSentimentAnalyzer
+    from sentiment import RESULT_FIELDS, FinBERTSentimentAnalyzer
 
 # Load environment variables
 load_dotenv()
@@ -41,6 +48,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Sentiment columns appended to each post row, in output order
+SENTIMENT_COLUMNS = [
+    "sentiment_label",
+    "sentiment_confidence",
+    "sentiment_positive",
+    "sentiment_negative",
+    "sentiment_neutral",
+    "sentiment_score",
+]
+
+# Explicit column dtypes for the posts DataFrame, instead of letting pandas
+# infer object/int64 columns
+POST_DTYPES = {
+    "post_id": "string",
+    "title": "string",
+    "content": "string",
+    "score": "int32",
+    "created_utc": "int64",
+    "subreddit": "category",
+    "url": "string",
+    "num_comments": "int32",
+}
+
+# Number of posts scored per step when streaming results to CSV
+STREAM_CHUNK_SIZE = 256
+
+# Sentiment row in RESULT_FIELDS order, used when the analyzer is unavailable
+NEUTRAL_SENTIMENT = ("neutral", 0.5, 0.33, 0.33, 0.34)
+
 
 class RedditSentimentCollector:
     """Main collector class for Reddit sentiment analysis."""
@@ -49,6 +85,8 @@ class RedditSentimentCollector:
         """Initialize collector with configuration."""
         self.output_path = os.getenv("OUTPUT_PATH", "/data/reddit_sentiment.csv")
         self.run_id = os.getenv("RUN_ID", datetime.now().strftime("%Y%m%d_%H%M%S"))
+        self.csv_drop_url = os.getenv("CSV_DROP_URL", "false").lower() == "true"
+        self.csv_content_max_chars = int(os.getenv("CSV_CONTENT_MAX_CHARS", "0"))
 
         # Reddit configuration
         self.subreddits = os.getenv(
@@ -58,12 +96,14 @@ class RedditSentimentCollector:
 
         # Deduplication configuration
         dedup_db_path = os.getenv("DEDUP_DB_PATH", "/data/dupes.db")
-        dedup_capacity = int(os.getenv("DEDUP_CAPACITY", "100000"))
 
         # Sentiment analysis configuration
         finbert_model = os.getenv("FINBERT_MODEL", "ProsusAI/finbert")
         sentiment_batch_size = int(os.getenv("SENTIMENT_BATCH_SIZE", "8"))
         enable_sentiment = os.getenv("ENABLE_SENTIMENT", "true").lower() == "true"
+        compile_model = os.getenv("ENABLE_TORCH_COMPILE", "false").lower() == "true"
+        finbert_precision = os.getenv("FINBERT_PRECISION", "fp32")
+        finbert_onnx_dir = os.getenv("FINBERT_ONNX_DIR", "/data/finbert-onnx")
 
         # Metrics configuration
         self.enable_metrics = os.getenv("ENABLE_METRICS", "true").lower() == "true"
@@ -72,25 +112,29 @@ class RedditSentimentCollector:
         # Initialize metrics
         if self.enable_metrics:
             self.metrics = get_metrics()
+            self._proc = psutil.Process()
             self.metrics_server = MetricsServer(
                 port=self.metrics_port, metrics=self.metrics
             )
             logger.info(f"Metrics enabled on port {self.metrics_port}")
         else:
             self.metrics = None
+            self._proc = None
             self.metrics_server = None
             logger.info("Metrics disabled")
 
         # Initialize components
         self.reddit = self._init_reddit_client()
-        self.deduplicator = PostDeduplicator(
-            db_path=dedup_db_path, capacity=dedup_capacity
-        )
+        self.deduplicator = PostDeduplicator(db_path=dedup_db_path)
 
         # Initialize sentiment analyzer
         if enable_sentiment:
             self.sentiment_analyzer = self._init_sentiment_analyzer(
-                finbert_model, sentiment_batch_size
+                finbert_model,
+                sentiment_batch_size,
+                compile_model,
+                finbert_precision,
+                finbert_onnx_dir,
             )
         else:
             self.sentiment_analyzer = None
@@ -123,10 +167,12 @@ class RedditSentimentCollector:
                 client_id=client_id,
                 client_secret=client_secret,
                 user_agent=user_agent,
+                check_for_async=False,
             )
 
-            # Test the connection
-            reddit.user.me()
+            # The collector only reads public listings, so skip the user
+            # handshake; bad credentials surface on the first fetch instead
+            reddit.read_only = True
             logger.info("Reddit client initialized successfully")
             return reddit
 
@@ -137,13 +183,22 @@ class RedditSentimentCollector:
             return None
 
     def _init_sentiment_analyzer(
-        self, model_name: str, batch_size: int
+        self,
+        model_name: str,
+        batch_size: int,
+        compile_model: bool = False,
+        precision: str = "fp32",
+        onnx_cache_dir: str = "/data/finbert-onnx",
     ) -> FinBERTSentimentAnalyzer:
         """Initialize FinBERT sentiment analyzer with error handling."""
         try:
             start_time = time.time()
             analyzer = FinBERTSentimentAnalyzer(
-                model_name=model_name, batch_size=batch_size
+                model_name=model_name,
+                batch_size=batch_size,
+                compile_model=compile_model,
+                precision=precision,
+                onnx_cache_dir=onnx_cache_dir,
             )
             load_duration = time.time() - start_time
 
@@ -186,60 +241,180 @@ class RedditSentimentCollector:
             # Ensure output directory exists
             Path(self.output_path).parent.mkdir(parents=True, exist_ok=True)
 
+            if self.csv_drop_url:
+                df = df.drop(columns=["url"], errors="ignore")
+            if self.csv_content_max_chars > 0 and "content" in df.columns:
+                df = df.assign(
+                    content=df["content"].str.slice(0, self.csv_content_max_chars)
+                )
+
             df.to_csv(self.output_path, index=False)
             logger.info(f"Successfully saved {len(df)} records to {self.output_path}")
         except Exception as e:
             logger.error(f"Failed to save CSV: {e}")
             raise
 
+    def save_streaming(
+        self, posts: List[Dict[str, Any]], sentiment_iter: Iterable[Tuple[Any, ...]]
+    ) -> int:
+        """
+        Write posts and their sentiment straight to CSV.
+
+        Produces the same columns as posts_to_dataframe followed by
+        save_to_csv, without materializing a DataFrame. Rows are written as
+        sentiment_iter yields sentiment tuples in RESULT_FIELDS order.
+
+        Returns:
+            Number of records written
+        """
+        try:
+            with self._csv_output() as write:
+                write(posts, sentiment_iter)
+        except Exception as e:
+            logger.error(f"Failed to save CSV: {e}")
+            raise
+
+        logger.info(f"Successfully saved {len(posts)} records to {self.output_path}")
+        return len(posts)
+
+    @contextmanager
+    def _csv_output(
+        self,
+    ) -> Iterator[Callable[[List[Dict[str, Any]], Iterable[Tuple[Any, ...]]], None]]:
+        """
+        Stream batches of posts and their sentiment to the output CSV.
+
+        Yields a function that appends one batch of rows; the columns are
+        taken from the first batch. Rows go to a temporary file next to the
+        output, which replaces the output once the block completes. If no
+        batch was written, or the block raises, the previous output is kept.
+        """
+        output_path = Path(self.output_path)
+        tmp_path = output_path.with_name(f"{output_path.name}.tmp")
+        f = None
+        writer = None
+        post_columns: List[str] = []
+
+        def write(
+            posts: List[Dict[str, Any]], sentiment_iter: Iterable[Tuple[Any, ...]]
+        ) -> None:
+            nonlocal f, writer, post_columns
+            if writer is None:
+                # Ensure output directory exists
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                f = open(tmp_path, "w", buffering=1 << 20, newline="", encoding="utf-8")
+                writer = csv.writer(f, lineterminator="\n")
+
+                post_columns = list(
+                    dict.fromkeys(key for post in posts for key in post)
+                )
+                if self.csv_drop_url and "url" in post_columns:
+                    post_columns.remove("url")
+                writer.writerow(post_columns + SENTIMENT_COLUMNS + ["run_id"])
+
+            writer.writerows(
+                [post.get(column) for column in post_columns]
+                + [
+                    *sentiment,
+                    sentiment[1],  # Legacy sentiment_score (confidence)
+                    self.run_id,
+                ]
+                for post, sentiment in zip(self._csv_posts(posts), sentiment_iter)
+            )
+
+        try:
+            yield write
+        except BaseException:
+            if f is not None:
+                f.close()
+                tmp_path.unlink(missing_ok=True)
+            raise
+
+        if f is not None:
+            f.close()
+            os.replace(tmp_path, output_path)
+
+    def _csv_posts(self, posts: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield posts with content truncated to the configured CSV limit."""
+        max_chars = self.csv_content_max_chars
+        for post in posts:
+            content = post.get("content")
+            if max_chars > 0 and isinstance(content, str) and len(content) > max_chars:
+                post = {**post, "content": content[:max_chars]}
+            yield post
+
     def fetch_reddit_posts(self) -> List[Dict[str, Any]]:
         """Fetch posts from configured subreddits."""
+        posts = [post for batch in self._iter_post_batches() for post in batch]
+
+        logger.info(f"Total posts fetched: {len(posts)}")
+        return posts
+
+    def _iter_post_batches(self) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield fetched posts one subreddit at a time.
+
+        Fetching runs on a background thread and hands each subreddit's posts
+        over through a queue, so callers can process a batch while the
+        remaining subreddits are still being fetched.
+        """
         if not self.reddit:
             logger.info("No Reddit client available - using dummy data")
-            return self._get_dummy_posts()
+            yield self._get_dummy_posts()
+            return
 
-        posts = []
+        batches: queue.Queue = queue.Queue()
 
-        for subreddit_name in self.subreddits:
+        def produce() -> None:
             try:
-                logger.info(f"Fetching posts from r/{subreddit_name}")
-                subreddit = self.reddit.subreddit(subreddit_name)
-                subreddit_posts = []
-
-                # Fetch hot posts from the last hour
-                for post in subreddit.hot(limit=self.fetch_limit):
-                    post_data = {
-                        "post_id": post.id,
-                        "title": post.title,
-                        "content": post.selftext if post.selftext else "",
-                        "score": post.score,
-                        "created_utc": int(post.created_utc),
-                        "subreddit": subreddit_name,
-                        "url": post.url,
-                        "num_comments": post.num_comments,
-                    }
-                    subreddit_posts.append(post_data)
-
-                posts.extend(subreddit_posts)
-
-                # Record metrics for this subreddit
-                if self.metrics:
-                    self.metrics.record_posts_fetched(
-                        len(subreddit_posts), subreddit_name
-                    )
-
-                logger.info(
-                    f"Fetched {len(subreddit_posts)} posts from r/{subreddit_name}"
-                )
+                # Each subreddit is a blocking HTTPS round-trip, so fetch them
+                # concurrently; map() keeps the configured subreddit order
+                with ThreadPoolExecutor(
+                    max_workers=max(1, len(self.subreddits))
+                ) as executor:
+                    for batch in executor.map(self._fetch_subreddit, self.subreddits):
+                        batches.put(batch)
+            finally:
+                batches.put(None)
+
+        threading.Thread(target=produce, name="reddit-fetch", daemon=True).start()
+
+        while (batch := batches.get()) is not None:
+            yield batch
+
+    def _fetch_subreddit(self, subreddit_name: str) -> List[Dict[str, Any]]:
+        """Fetch hot posts from a single subreddit."""
+        try:
+            logger.info(f"Fetching posts from r/{subreddit_name}")
+            subreddit = self.reddit.subreddit(subreddit_name)
+            subreddit_posts = []
+
+            # Fetch hot posts from the last hour
+            for post in subreddit.hot(limit=self.fetch_limit):
+                post_data = {
+                    "post_id": post.id,
+                    "title": post.title,
+                    "content": post.selftext if post.selftext else "",
+                    "score": post.score,
+                    "created_utc": int(post.created_utc),
+                    "subreddit": subreddit_name,
+                    "url": post.url,
+                    "num_comments": post.num_comments,
+                }
+                subreddit_posts.append(post_data)
+
+            # Record metrics for this subreddit
+            if self.metrics:
+                self.metrics.record_posts_fetched(len(subreddit_posts), subreddit_name)
 
-            except Exception as e:
-                if self.metrics:
-                    self.metrics.record_reddit_api_error("fetch_failed")
-                logger.error(f"Failed to fetch from r/{subreddit_name}: {e}")
-                continue
+            logger.info(f"Fetched {len(subreddit_posts)} posts from r/{subreddit_name}")
+            return subreddit_posts
 
-        logger.info(f"Total posts fetched: {len(posts)}")
-        return posts
+        except Exception as e:
+            if self.metrics:
+                self.metrics.record_reddit_api_error("fetch_failed")
+            logger.error(f"Failed to fetch from r/{subreddit_name}: {e}")
+            return []
 
     def _get_dummy_posts(self) -> List[Dict[str, Any]]:
         """Generate dummy posts for testing."""
@@ -266,6 +441,77 @@ class RedditSentimentCollector:
             },
         ]
 
+    @staticmethod
+    def _combine_texts(titles: Iterable[Any], contents: Iterable[Any]) -> List[str]:
+        """Combine titles and contents, prioritizing title if content is empty."""
+        pairs = (
+            (str(title or ""), str(content or ""))
+            for title, content in zip(titles, contents)
+        )
+        return [
+            f"{title}. {content}".strip() if content else title
+            for title, content in pairs
+        ]
+
+    def _analyze_sorted(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Run batch sentiment analysis on length-sorted texts.
+
+        Sorting lets each model batch pad to similar sequence lengths; the
+        result columns are returned in the original order of texts.
+        """
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        sorted_arrays = self.sentiment_analyzer.analyze_batch_arrays(
+            [texts[i] for i in order]
+        )
+        arrays = {}
+        for field, values in sorted_arrays.items():
+            arrays[field] = np.empty_like(values)
+            arrays[field][order] = values
+        return arrays
+
+    def _iter_sentiment(self, posts: List[Dict[str, Any]]) -> Iterator[Tuple[Any, ...]]:
+        """Yield sentiment rows for posts, scoring them chunk by chunk."""
+        if not self.sentiment_analyzer:
+            logger.info("Sentiment analyzer not available, using neutral sentiment")
+            for _ in posts:
+                yield NEUTRAL_SENTIMENT
+            return
+
+        logger.info(f"Analyzing sentiment for {len(posts)} posts...")
+        label_counts = Counter()
+        total_duration = 0.0
+
+        for start in range(0, len(posts), STREAM_CHUNK_SIZE):
+            chunk = posts[start : start + STREAM_CHUNK_SIZE]
+
+            start_time = time.time()
+            texts = self._combine_texts(
+                (post.get("title") for post in chunk),
+                (post.get("content") for post in chunk),
+            )
+            arrays = self._analyze_sorted(texts)
+            duration = time.time() - start_time
+            total_duration += duration
+
+            # Record sentiment analysis metrics
+            if self.metrics:
+                self.metrics.record_sentiment_analysis(duration, len(chunk))
+
+            columns = [arrays[field].tolist() for field in RESULT_FIELDS]
+            label_counts.update(columns[0])
+            yield from zip(*columns)
+
+        logger.info(
+            f"Sentiment analysis completed for {len(posts)} posts "
+            f"({total_duration:.2f}s)"
+        )
+
+        # Log sentiment distribution and record metrics
+        logger.info(f"Sentiment distribution: {dict(label_counts)}")
+        if self.metrics:
+            self.metrics.record_sentiment_distribution(dict(label_counts))
+
     def posts_to_dataframe(self, posts: List[Dict[str, Any]]) -> pd.DataFrame:
         """Convert posts list to DataFrame with sentiment analysis."""
         if not posts:
@@ -273,6 +519,7 @@ class RedditSentimentCollector:
             return pd.DataFrame()
 
         df = pd.DataFrame(posts)
+        df = df.astype({k: v for k, v in POST_DTYPES.items() if k in df.columns})
 
         # Perform sentiment analysis
         if self.sentiment_analyzer:
@@ -281,38 +528,25 @@ class RedditSentimentCollector:
             start_time = time.time()
 
             # Combine title and content for sentiment analysis
-            texts_for_analysis = []
-            for _, row in df.iterrows():
-                title = row.get("title", "")
-                content = row.get("content", "")
-                # Combine title and content, prioritizing title if content is empty
-                combined_text = f"{title}. {content}".strip() if content else title
-                texts_for_analysis.append(combined_text)
+            empty = pd.Series("", index=df.index)
+            texts_for_analysis = self._combine_texts(
+                df.get("title", empty).fillna("").tolist(),
+                df.get("content", empty).fillna("").tolist(),
+            )
 
             # Batch sentiment analysis
-            sentiment_results = self.sentiment_analyzer.analyze_batch(
-                texts_for_analysis
-            )
+            sentiment_results = self._analyze_sorted(texts_for_analysis)
 
             # Record sentiment analysis metrics
             analysis_duration = time.time() - start_time
             if self.metrics:
                 self.metrics.record_sentiment_analysis(analysis_duration, len(df))
 
-            # Add sentiment columns
-            df["sentiment_label"] = [result["label"] for result in sentiment_results]
-            df["sentiment_confidence"] = [
-                result["confidence"] for result in sentiment_results
-            ]
-            df["sentiment_positive"] = [
-                result["positive"] for result in sentiment_results
-            ]
-            df["sentiment_negative"] = [
-                result["negative"] for result in sentiment_results
-            ]
-            df["sentiment_neutral"] = [
-                result["neutral"] for result in sentiment_results
-            ]
+            # Add sentiment columns, built as one frame in a single pass
+            sentiment_df = pd.DataFrame(
+                sentiment_results, index=df.index, columns=list(RESULT_FIELDS)
+            ).add_prefix("sentiment_")
+            df = df.join(sentiment_df)
 
             # Legacy compatibility - use confidence as score
             df["sentiment_score"] = df["sentiment_confidence"]
@@ -339,6 +573,7 @@ class RedditSentimentCollector:
             df["sentiment_neutral"] = 0.34
             df["sentiment_score"] = 0.5  # Legacy compatibility
 
+        df["sentiment_label"] = df["sentiment_label"].astype("category")
         df["run_id"] = self.run_id
 
         logger.info(f"Created DataFrame with {len(df)} posts")
@@ -352,49 +587,54 @@ class RedditSentimentCollector:
         try:
             # Record memory usage
             if self.metrics:
-                memory_usage = psutil.Process().memory_info().rss
+                memory_usage = self._proc.memory_info().rss
                 self.metrics.record_memory_usage(memory_usage)
                 self.metrics.reset_health_status()
 
-            # Fetch posts from Reddit
-            posts = self.fetch_reddit_posts()
+            # Deduplicate, score and write each subreddit's posts while the
+            # rest are still being fetched; the output is only replaced once
+            # every batch has been written
+            posts_fetched = 0
+            records_saved = 0
+
+            with self._csv_output() as write:
+                for batch in self._iter_post_batches():
+                    posts_fetched += len(batch)
+                    if not batch:
+                        continue
+
+                    logger.info(f"Deduplicating {len(batch)} posts...")
+                    unique_batch = self.deduplicator.deduplicate_posts(batch)
+                    if unique_batch:
+                        write(unique_batch, self._iter_sentiment(unique_batch))
+                        records_saved += len(unique_batch)
 
-            if not posts:
+            logger.info(f"Total posts fetched: {posts_fetched}")
+
+            if not posts_fetched:
                 logger.warning("No posts fetched - exiting")
                 if self.metrics:
                     self.metrics.record_error("pipeline", "no_posts_fetched")
                 return
 
-            # Deduplicate posts
-            logger.info(f"Deduplicating {len(posts)} posts...")
-            unique_posts = self.deduplicator.deduplicate_posts(posts)
-
             # Record deduplication metrics
-            duplicates_count = len(posts) - len(unique_posts)
+            duplicates_count = posts_fetched - records_saved
             if self.metrics:
                 self.metrics.record_posts_deduplicated(duplicates_count)
 
-            if not unique_posts:
+            if not records_saved:
                 logger.warning("No unique posts after deduplication - exiting")
                 if self.metrics:
                     self.metrics.record_error("pipeline", "no_unique_posts")
                 return
 
-            # Convert to DataFrame
-            df = self.posts_to_dataframe(unique_posts)
-
-            if df.empty:
-                logger.warning("Empty DataFrame - exiting")
-                if self.metrics:
-                    self.metrics.record_error("pipeline", "empty_dataframe")
-                return
+            logger.info(
+                f"Successfully saved {records_saved} records to {self.output_path}"
+            )
 
             # Record processed posts
             if self.metrics:
-                self.metrics.record_posts_processed(len(df))
-
-            # Save to CSV
-            self.save_to_csv(df)
+                self.metrics.record_posts_processed(records_saved)
 
             # Log deduplication stats
             stats = self.deduplicator.get_stats()
@@ -419,6 +659,8 @@ class RedditSentimentCollector:
         if self.metrics_server:
             logger.info("Stopping metrics server...")
             self.metrics_server.stop()
+        if self.deduplicator:
+            self.deduplicator.close()
         logger.info("Collector shutdown complete")
 
 
@@ -428,6 +670,7 @@ class CollectorManager:
     def __init__(self):
         self.collector = None
         self.running = True
+        self._stop = threading.Event()
         self.setup_signal_handlers()
 
     def setup_signal_handlers(self):
@@ -439,6 +682,7 @@ class CollectorManager:
         """Handle shutdown signals."""
         logger.info(f"Received signal {signum}, initiating graceful shutdown...")
         self.running = False
+        self._stop.set()
         if self.collector:
             self.collector.shutdown()
         sys.exit(0)
@@ -457,10 +701,10 @@ class CollectorManager:
                     f"Metrics server started on port {self.collector.metrics_port}"
                 )
 
-            # Keep the service running
+            # Keep the service running; block without periodic wake-ups until
+            # a shutdown signal sets the stop event
             logger.info("Collector service is running. Press Ctrl+C to stop.")
-            while self.running:
-                time.sleep(10)  # Check every 10 seconds
+            self._stop.wait()
 
         except KeyboardInterrupt:
             logger.info("Received keyboard interrupt")
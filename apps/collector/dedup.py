@@ -1,44 +1,74 @@
-"""De-duplication logic for Reddit posts using Bloom filter and SQLite."""
+"""De-duplication logic for Reddit posts using SQLite."""
 
-import hashlib
+import json
 import logging
 import sqlite3
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import AbstractSet, Any, Dict, Iterable, List, Optional, Set
 
-from pybloom_live import BloomFilter
+import blake3
 
 logger = logging.getLogger(__name__)
 
+# Length in bytes of the stored content hashes
+CONTENT_HASH_SIZE = 16
+
+
+def _post_content_bytes(post: Dict[str, Any]) -> bytes:
+    """Return the UTF-8 encoded ``title\ncontent`` payload used for hashing."""
+    return f"{post.get('title', '')}\n{post.get('content', '')}".encode("utf-8")
+
+
+def _hash_content(content_bytes: bytes) -> bytes:
+    """
+    Hash an encoded post payload.
+
+    The hash is only a de-duplication key, not a security boundary, so the
+    faster BLAKE3 is used with a 128-bit digest, which is comfortably
+    collision-free at the cache sizes involved.
+    """
+    return blake3.blake3(content_bytes).digest(length=CONTENT_HASH_SIZE)
 
-class PostDeduplicator:
-    """Handles de-duplication of Reddit posts using Bloom filter and SQLite cache."""
 
-    def __init__(self, db_path: str = "/data/dupes.db", capacity: int = 100000):
+class PostDeduplicator:
+    """Handles de-duplication of Reddit posts using an indexed SQLite cache."""
+
+    # Keyed and clustered on the 16-byte content hash, so duplicate lookups
+    # read the table b-tree directly instead of going through an extra index
+    _POSTS_SCHEMA = """
+        (
+            content_hash BLOB PRIMARY KEY,
+            post_id TEXT UNIQUE NOT NULL,
+            title TEXT NOT NULL,
+            subreddit TEXT NOT NULL,
+            created_utc INTEGER NOT NULL,
+            first_seen_utc INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """
+
+    _POST_COLUMNS = (
+        "post_id, content_hash, title, subreddit, created_utc, first_seen_utc"
+    )
+
+    _INSERT_POST_SQL = """
+        INSERT OR IGNORE INTO posts
+        (post_id, content_hash, title, subreddit, created_utc, first_seen_utc)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+
+    def __init__(self, db_path: str = "/data/dupes.db"):
         """
         Initialize the deduplicator.
 
         Args:
             db_path: Path to SQLite database for persistent storage
-            capacity: Expected number of posts for Bloom filter sizing
         """
         self.db_path = db_path
-        self.capacity = capacity
-        self.error_rate = 0.1  # 10% false positive rate for Bloom filter
-
-        # Initialize Bloom filter
-        self.bloom_filter = BloomFilter(capacity=capacity, error_rate=self.error_rate)
 
         # Initialize SQLite database
         self._init_database()
 
-        # Load existing hashes into Bloom filter
-        self._load_existing_hashes()
-
-        logger.info(
-            f"Deduplicator initialized with capacity={capacity}, "
-            f"error_rate={self.error_rate}, db_path={db_path}"
-        )
+        logger.info(f"Deduplicator initialized with db_path={db_path}")
 
     def _init_database(self) -> None:
         """Initialize SQLite database with posts table."""
@@ -46,33 +76,63 @@ class PostDeduplicator:
             # Ensure directory exists
             Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # Single long-lived connection in autocommit mode; transactions are
+            # opened explicitly so a whole batch commits (and syncs) once
+            self._conn = sqlite3.connect(self.db_path, isolation_level=None)
+            self._conn.executescript(
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA temp_store=MEMORY;"
+                "PRAGMA cache_size=-8000;"
+            )
+
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
 
             # Create posts table if it doesn't exist
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS posts {self._POSTS_SCHEMA}")
+
+            # SHA-256 hashes (hex text or 32-byte blobs) written by earlier
+            # versions can't be rehashed, as post content is not stored. Their
+            # post IDs are kept so those posts are still suppressed; each is
+            # stored under its new hash the next time it is seen
             cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS posts (
-                    post_id TEXT PRIMARY KEY,
-                    content_hash TEXT UNIQUE NOT NULL,
-                    title TEXT NOT NULL,
-                    subreddit TEXT NOT NULL,
-                    created_utc INTEGER NOT NULL,
-                    first_seen_utc INTEGER NOT NULL
-                )
-            """
+                "CREATE TABLE IF NOT EXISTS legacy_post_ids "
+                "(post_id TEXT PRIMARY KEY) WITHOUT ROWID"
+            )
+            legacy_rows = (
+                "FROM posts WHERE typeof(content_hash) != 'blob' "
+                "OR length(content_hash) != ?"
             )
-
-            # Create index on content_hash for faster lookups
             cursor.execute(
-                """
-                CREATE INDEX IF NOT EXISTS idx_content_hash
-                ON posts(content_hash)
-            """
+                f"INSERT OR IGNORE INTO legacy_post_ids SELECT post_id {legacy_rows}",
+                (CONTENT_HASH_SIZE,),
             )
+            cursor.execute(f"DELETE {legacy_rows}", (CONTENT_HASH_SIZE,))
+            if cursor.rowcount > 0:
+                logger.warning(
+                    f"Moved {cursor.rowcount} legacy SHA-256 content hashes to "
+                    "legacy_post_ids; those posts are matched by post_id until "
+                    "they are seen again and rehashed"
+                )
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM legacy_post_ids)")
+            self._has_legacy_post_ids = bool(cursor.fetchone()[0])
+
+            # Rebuild tables from earlier versions, which were keyed on post_id
+            # and carried a separate idx_content_hash index
+            cursor.execute("PRAGMA table_info(posts)")
+            primary_key = [row[1] for row in cursor.fetchall() if row[5]]
+            if primary_key != ["content_hash"]:
+                cursor.execute(f"CREATE TABLE posts_new {self._POSTS_SCHEMA}")
+                cursor.execute(
+                    f"INSERT OR IGNORE INTO posts_new ({self._POST_COLUMNS}) "
+                    f"SELECT {self._POST_COLUMNS} FROM posts"
+                )
+                cursor.execute("DROP TABLE posts")
+                cursor.execute("ALTER TABLE posts_new RENAME TO posts")
+                logger.info("Migrated posts table to content_hash primary key")
 
-            conn.commit()
-            conn.close()
+            cursor.execute("COMMIT")
 
             logger.info("Database initialized successfully")
 
@@ -80,113 +140,74 @@ class PostDeduplicator:
             logger.error(f"Failed to initialize database: {e}")
             raise
 
-    def _load_existing_hashes(self) -> None:
-        """Load existing content hashes into Bloom filter."""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT content_hash FROM posts")
-            rows = cursor.fetchall()
-
-            for row in rows:
-                self.bloom_filter.add(row[0])
-
-            conn.close()
-
-            logger.info(f"Loaded {len(rows)} existing hashes into Bloom filter")
-
-        except Exception as e:
-            logger.warning(f"Failed to load existing hashes: {e}")
-
-    def _generate_content_hash(self, post: Dict[str, Any]) -> str:
+    def _generate_content_hash(self, post: Dict[str, Any]) -> bytes:
         """
-        Generate SHA-256 hash of post content for deduplication.
+        Generate BLAKE3 hash of post content for deduplication.
 
         Args:
             post: Dictionary containing post data
 
         Returns:
-            SHA-256 hash as hexadecimal string
+            16-byte BLAKE3 digest as raw bytes
         """
-        # Combine title and content for hashing
-        content = f"{post.get('title', '')}\n{post.get('content', '')}"
-        content_bytes = content.encode("utf-8")
-        return hashlib.sha256(content_bytes).hexdigest()
+        return _hash_content(_post_content_bytes(post))
 
-    def is_duplicate(self, post: Dict[str, Any]) -> bool:
+    def is_duplicate(
+        self, post: Dict[str, Any], content_hash: Optional[bytes] = None
+    ) -> bool:
         """
         Check if a post is a duplicate.
 
         Args:
             post: Dictionary containing post data
+            content_hash: Precomputed content hash, generated from post if omitted
 
         Returns:
             True if post is a duplicate, False otherwise
         """
-        content_hash = self._generate_content_hash(post)
+        if content_hash is None:
+            content_hash = self._generate_content_hash(post)
 
-        # First check Bloom filter for fast negative lookup
-        if content_hash not in self.bloom_filter:
-            return False
-
-        # If Bloom filter says it might exist, check SQLite for definitive answer
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute(
-                "SELECT COUNT(*) FROM posts WHERE content_hash = ?", (content_hash,)
+            cursor = self._conn.execute(
+                "SELECT 1 FROM posts WHERE content_hash = ? LIMIT 1", (content_hash,)
             )
-            count = cursor.fetchone()[0]
-
-            conn.close()
-
-            return count > 0
+            if cursor.fetchone() is not None:
+                return True
+            return bool(self._find_legacy_post_ids([post.get("post_id", "")]))
 
         except Exception as e:
             logger.error(f"Error checking for duplicate in database: {e}")
             # On error, assume it's not a duplicate to avoid losing posts
             return False
 
-    def add_post(self, post: Dict[str, Any]) -> None:
+    def add_post(
+        self, post: Dict[str, Any], content_hash: Optional[bytes] = None
+    ) -> None:
         """
         Add a post to the deduplication cache.
 
         Args:
             post: Dictionary containing post data
+            content_hash: Precomputed content hash, generated from post if omitted
         """
-        content_hash = self._generate_content_hash(post)
-
-        # Add to Bloom filter
-        self.bloom_filter.add(content_hash)
-
-        # Add to SQLite database
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                INSERT OR IGNORE INTO posts
-                (post_id, content_hash, title, subreddit, created_utc, first_seen_utc)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    post.get("post_id", ""),
-                    content_hash,
-                    post.get("title", ""),
-                    post.get("subreddit", ""),
-                    post.get("created_utc", 0),
-                    post.get("created_utc", 0),  # Use post creation time as first seen
-                ),
-            )
-
-            conn.commit()
-            conn.close()
-
-        except Exception as e:
-            logger.error(f"Error adding post to database: {e}")
+        if content_hash is None:
+            content_hash = self._generate_content_hash(post)
+        self._insert_rows([self._post_row(post, content_hash)])
+
+    @staticmethod
+    def _post_row(post: Dict[str, Any], content_hash: bytes) -> tuple:
+        """Build the posts table row for a post."""
+        get = post.get
+        created_utc = get("created_utc", 0)
+        return (
+            get("post_id", ""),
+            content_hash,
+            get("title", ""),
+            get("subreddit", ""),
+            created_utc,
+            created_utc,  # Use post creation time as first seen
+        )
 
     def deduplicate_posts(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -199,14 +220,44 @@ class PostDeduplicator:
             List of unique posts with duplicates removed
         """
         unique_posts = []
+        new_posts = []
+        new_hashes = []
         duplicates_found = 0
 
-        for post in posts:
-            if not self.is_duplicate(post):
-                self.add_post(post)
-                unique_posts.append(post)
-            else:
+        # Encode and hash the whole batch up front so the hot loop only does
+        # membership checks
+        contents = [_post_content_bytes(post) for post in posts]
+        hashes = [_hash_content(content) for content in contents]
+
+        # Resolve the whole batch against the stored hashes in one query, then
+        # track hashes seen in this batch so in-batch repeats are dropped too
+        seen_db = self._find_known_hashes(hashes)
+        seen_batch: Set[bytes] = set()
+
+        # Posts stored by earlier versions are only known by post_id; they are
+        # duplicates, but are stored under their new hash like unique posts
+        legacy_ids = self._find_legacy_post_ids(
+            post.get("post_id", "") for post in posts
+        )
+
+        for post, content_hash in zip(posts, hashes):
+            if content_hash in seen_db or content_hash in seen_batch:
+                duplicates_found += 1
+                continue
+
+            seen_batch.add(content_hash)
+            new_posts.append(post)
+            new_hashes.append(content_hash)
+            if legacy_ids and post.get("post_id", "") in legacy_ids:
                 duplicates_found += 1
+            else:
+                unique_posts.append(post)
+
+        # Build all insert rows in one pass once the new set is known
+        post_row = self._post_row
+        self._insert_rows(
+            [post_row(post, h) for post, h in zip(new_posts, new_hashes)], legacy_ids
+        )
 
         logger.info(
             f"Deduplication complete: {len(unique_posts)} unique posts, "
@@ -215,6 +266,95 @@ class PostDeduplicator:
 
         return unique_posts
 
+    def _find_known_hashes(self, hashes: List[bytes]) -> Set[bytes]:
+        """Return the subset of hashes already stored in SQLite."""
+        if not hashes:
+            return set()
+
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS incoming_hashes "
+                "(content_hash BLOB PRIMARY KEY)"
+            )
+            cursor.execute("DELETE FROM incoming_hashes")
+            cursor.executemany(
+                "INSERT OR IGNORE INTO incoming_hashes VALUES (?)",
+                [(h,) for h in hashes],
+            )
+            cursor.execute("""
+                SELECT p.content_hash
+                FROM incoming_hashes i
+                JOIN posts p ON p.content_hash = i.content_hash
+            """)
+            known_hashes = {row[0] for row in cursor.fetchall()}
+            cursor.execute("COMMIT")
+            return known_hashes
+
+        except Exception as e:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            logger.error(f"Error checking for duplicates in database: {e}")
+            # On error, assume nothing is a duplicate to avoid losing posts
+            return set()
+
+    def _find_legacy_post_ids(self, post_ids: Iterable[str]) -> Set[str]:
+        """Return the post IDs still only known from legacy SHA-256 hashes."""
+        if not self._has_legacy_post_ids:
+            return set()
+
+        try:
+            cursor = self._conn.execute(
+                "SELECT post_id FROM legacy_post_ids "
+                "WHERE post_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(post_ids)),),
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+        except Exception as e:
+            logger.error(f"Error checking for legacy post IDs in database: {e}")
+            return set()
+
+    def _insert_rows(
+        self, rows: List[tuple], rehashed_ids: AbstractSet[str] = frozenset()
+    ) -> None:
+        """
+        Insert new post rows in a single transaction.
+
+        Args:
+            rows: Rows for the posts table
+            rehashed_ids: Legacy post IDs now stored under their new hash
+        """
+        if not rows:
+            return
+
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
+            cursor.executemany(self._INSERT_POST_SQL, rows)
+            if rehashed_ids:
+                cursor.executemany(
+                    "DELETE FROM legacy_post_ids WHERE post_id = ?",
+                    [(post_id,) for post_id in rehashed_ids],
+                )
+                cursor.execute("SELECT EXISTS (SELECT 1 FROM legacy_post_ids)")
+                self._has_legacy_post_ids = bool(cursor.fetchone()[0])
+            cursor.execute("COMMIT")
+
+        except Exception as e:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            logger.error(f"Error adding posts to database: {e}")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        if self._conn is None:
+            return
+
+        self._conn.close()
+        self._conn = None
+
     def get_stats(self) -> Dict[str, Any]:
         """
         Get deduplication statistics.
@@ -223,37 +363,30 @@ class PostDeduplicator:
             Dictionary with statistics about stored posts
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self._conn.cursor()
 
             # Total posts
             cursor.execute("SELECT COUNT(*) FROM posts")
             total_posts = cursor.fetchone()[0]
 
             # Posts by subreddit
-            cursor.execute(
-                """
+            cursor.execute("""
                 SELECT subreddit, COUNT(*)
                 FROM posts
                 GROUP BY subreddit
                 ORDER BY COUNT(*) DESC
-            """
-            )
+            """)
             by_subreddit = dict(cursor.fetchall())
 
             # Oldest and newest posts
             cursor.execute("SELECT MIN(first_seen_utc), MAX(first_seen_utc) FROM posts")
             oldest, newest = cursor.fetchone()
 
-            conn.close()
-
             return {
                 "total_posts": total_posts,
                 "by_subreddit": by_subreddit,
                 "oldest_post": oldest,
                 "newest_post": newest,
-                "bloom_filter_capacity": self.capacity,
-                "bloom_filter_error_rate": self.error_rate,
             }
 
         except Exception as e:
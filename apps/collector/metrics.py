@@ -4,12 +4,20 @@ Prometheus Metrics Module
 
 Provides comprehensive monitoring metrics for the Reddit sentiment analysis pipeline.
 Tracks performance, health, and operational metrics for production monitoring.
+
+The record_* methods take bulk counts: callers tally per batch (e.g. with a
+collections.Counter) and record once, rather than once per post, since every
+update takes the metric's internal lock.
 """
 
+import asyncio
 import logging
+import os
+import threading
 import time
-from http.server import BaseHTTPRequestHandler
-from typing import Dict, Optional
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any, Dict, Optional, Tuple
 
 from prometheus_client import (
     CONTENT_TYPE_LATEST,
@@ -18,12 +26,30 @@ from prometheus_client import (
     Gauge,
     Histogram,
     Info,
+    ProcessCollector,
     generate_latest,
-    start_http_server,
 )
 
 logger = logging.getLogger(__name__)
 
+# Labels produced by FinBERT, pre-created on the sentiment distribution counter
+SENTIMENT_LABELS = ("positive", "negative", "neutral")
+
+# Seconds a client has to send its request line and headers
+REQUEST_READ_TIMEOUT = 10
+
+# Request paths served with the metrics exposition
+METRICS_PATHS = (b"/", b"/metrics")
+
+
+@dataclass
+class _CachedExposition:
+    """Rendered /metrics payload and when it was generated."""
+
+    body: bytes
+    content_type: str
+    generated_at: float
+
 
 class PipelineMetrics:
     """
@@ -36,34 +62,52 @@ class PipelineMetrics:
     - System health indicators
     """
 
-    def __init__(self, registry: Optional[CollectorRegistry] = None):
-        """Initialize metrics with optional custom registry."""
-        # Use provided registry or create new one, but not None
+    def __init__(
+        self,
+        registry: Optional[CollectorRegistry] = None,
+        cache_ttl: Optional[float] = None,
+    ):
+        """
+        Initialize metrics with optional custom registry.
+
+        Args:
+            registry: Registry to register metrics in (default: a new one)
+            cache_ttl: Seconds a rendered exposition is reused across scrapes
+                (default: METRICS_CACHE_TTL env var, or 5)
+        """
+        # Use a dedicated registry unless one is provided, so scrapes only
+        # walk pipeline metrics instead of every default collector; process
+        # metrics are kept for the health dashboard
         if registry is None:
-            from prometheus_client import REGISTRY
+            registry = CollectorRegistry()
+            ProcessCollector(registry=registry)
+        self.registry = registry
 
-            self.registry = REGISTRY
-        else:
-            self.registry = registry
+        # Rendered exposition shared between scrapes within cache_ttl
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv("METRICS_CACHE_TTL", "5"))
+        self.cache_ttl = cache_ttl
+        self._cached_exposition: Optional[_CachedExposition] = None
+        self._cache_lock = threading.Lock()
 
         # Collection metrics
         self.posts_fetched_total = Counter(
             "reddit_posts_fetched_total",
             "Total number of Reddit posts fetched from API",
             ["subreddit"],
-            registry=registry,
+            registry=self.registry,
         )
 
         self.posts_deduplicated_total = Counter(
             "reddit_posts_deduplicated_total",
             "Total number of duplicate posts filtered out",
-            registry=registry,
+            registry=self.registry,
         )
 
         self.posts_processed_total = Counter(
             "reddit_posts_processed_total",
             "Total number of posts successfully processed with sentiment",
-            registry=registry,
+            registry=self.registry,
         )
 
         # Sentiment analysis metrics
@@ -71,21 +115,21 @@ class PipelineMetrics:
             "sentiment_analysis_duration_seconds",
             "Time spent analyzing sentiment for batches",
             buckets=[0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0],
-            registry=registry,
+            registry=self.registry,
         )
 
         self.sentiment_batch_size = Histogram(
             "sentiment_batch_size",
             "Number of posts processed in sentiment batches",
-            buckets=[1, 5, 10, 25, 50, 100, 200],
-            registry=registry,
+            buckets=[1, 10, 50, 200],
+            registry=self.registry,
         )
 
         self.sentiment_distribution = Counter(
             "sentiment_distribution_total",
             "Distribution of sentiment labels",
             ["label"],
-            registry=registry,
+            registry=self.registry,
         )
 
         # Error tracking
@@ -93,106 +137,132 @@ class PipelineMetrics:
             "pipeline_errors_total",
             "Total number of errors by component",
             ["component", "error_type"],
-            registry=registry,
+            registry=self.registry,
         )
 
         self.reddit_api_errors_total = Counter(
             "reddit_api_errors_total",
             "Reddit API specific errors",
             ["error_type"],
-            registry=registry,
+            registry=self.registry,
         )
 
         # System health
         self.pipeline_status = Gauge(
             "pipeline_status",
             "Current pipeline status (1=healthy, 0=unhealthy)",
-            registry=registry,
+            registry=self.registry,
         )
 
         self.last_successful_run = Gauge(
             "pipeline_last_successful_run_timestamp",
             "Timestamp of last successful pipeline run",
-            registry=registry,
+            registry=self.registry,
         )
 
         self.pipeline_duration = Histogram(
             "pipeline_total_duration_seconds",
             "Total time for complete pipeline execution",
-            buckets=[10, 30, 60, 120, 300, 600, 1200],
-            registry=registry,
+            buckets=[30, 120, 600],
+            registry=self.registry,
         )
 
         # Resource usage
         self.memory_usage_bytes = Gauge(
             "pipeline_memory_usage_bytes",
             "Current memory usage of the pipeline process",
-            registry=registry,
+            registry=self.registry,
         )
 
         self.model_load_duration = Histogram(
             "finbert_model_load_duration_seconds",
             "Time taken to load FinBERT model",
-            buckets=[1, 5, 10, 30, 60, 120],
-            registry=registry,
+            buckets=[5, 30, 120],
+            registry=self.registry,
         )
 
         # Info metrics
         self.build_info = Info(
             "pipeline_build_info",
             "Build information for the pipeline",
-            registry=registry,
+            registry=self.registry,
         )
 
+        # Label children cached per label values, so hot record_* calls skip
+        # the .labels() lookup after the first use
+        self._posts_fetched_children: Dict[Tuple[str, ...], Any] = {}
+        self._sentiment_children: Dict[Tuple[str, ...], Any] = {}
+        self._error_children: Dict[Tuple[str, ...], Any] = {}
+        self._reddit_api_error_children: Dict[Tuple[str, ...], Any] = {}
+
+        for label in SENTIMENT_LABELS:
+            self._labelled(self._sentiment_children, self.sentiment_distribution, label)
+
         # Initialize status as healthy
         self.pipeline_status.set(1)
 
         logger.info("Prometheus metrics initialized successfully")
 
+    @staticmethod
+    def _labelled(cache: Dict[Tuple[str, ...], Any], metric: Any, *label_values: str):
+        """Return the metric child for label_values, caching it on first use."""
+        child = cache.get(label_values)
+        if child is None:
+            child = cache[label_values] = metric.labels(*label_values)
+        return child
+
     def record_posts_fetched(self, count: int, subreddit: str):
         """Record the number of posts fetched from a subreddit."""
-        self.posts_fetched_total.labels(subreddit=subreddit).inc(count)
-        logger.debug(f"Recorded {count} posts fetched from r/{subreddit}")
+        self._labelled(
+            self._posts_fetched_children, self.posts_fetched_total, subreddit
+        ).inc(count)
+        logger.debug("Recorded %d posts fetched from r/%s", count, subreddit)
 
     def record_posts_deduplicated(self, count: int):
         """Record the number of duplicate posts filtered out."""
         self.posts_deduplicated_total.inc(count)
-        logger.debug(f"Recorded {count} posts deduplicated")
+        logger.debug("Recorded %d posts deduplicated", count)
 
     def record_posts_processed(self, count: int):
         """Record the number of posts successfully processed."""
         self.posts_processed_total.inc(count)
-        logger.debug(f"Recorded {count} posts processed")
+        logger.debug("Recorded %d posts processed", count)
 
     def record_sentiment_analysis(self, duration: float, batch_size: int):
         """Record sentiment analysis performance metrics."""
         self.sentiment_analysis_duration.observe(duration)
         self.sentiment_batch_size.observe(batch_size)
         logger.debug(
-            f"Recorded sentiment analysis: {duration:.2f}s for {batch_size} posts"
+            "Recorded sentiment analysis: %.2fs for %d posts", duration, batch_size
         )
 
     def record_sentiment_distribution(self, sentiment_counts: Dict[str, int]):
         """Record the distribution of sentiment labels."""
+        children = self._sentiment_children
         for label, count in sentiment_counts.items():
-            self.sentiment_distribution.labels(label=label).inc(count)
-        logger.debug(f"Recorded sentiment distribution: {sentiment_counts}")
+            if count:
+                self._labelled(children, self.sentiment_distribution, label).inc(count)
+        logger.debug("Recorded sentiment distribution: %s", sentiment_counts)
 
     def record_error(self, component: str, error_type: str):
         """Record an error by component and type."""
-        self.errors_total.labels(component=component, error_type=error_type).inc()
+        self._labelled(
+            self._error_children, self.errors_total, component, error_type
+        ).inc()
         self.pipeline_status.set(0)  # Mark as unhealthy
         logger.warning(f"Recorded error in {component}: {error_type}")
 
     def record_reddit_api_error(self, error_type: str):
         """Record a Reddit API specific error."""
-        self.reddit_api_errors_total.labels(error_type=error_type).inc()
+        self._labelled(
+            self._reddit_api_error_children, self.reddit_api_errors_total, error_type
+        ).inc()
         logger.warning(f"Recorded Reddit API error: {error_type}")
 
     def record_successful_run(self, duration: float):
         """Record a successful pipeline run."""
         self.pipeline_status.set(1)  # Mark as healthy
-        self.last_successful_run.set(time.time())
+        self.last_successful_run.set(int(time.time()))  # Whole seconds
         self.pipeline_duration.observe(duration)
         logger.info(f"Recorded successful pipeline run: {duration:.2f}s")
 
@@ -203,7 +273,7 @@ class PipelineMetrics:
     def record_model_load_time(self, duration: float):
         """Record FinBERT model loading time."""
         self.model_load_duration.observe(duration)
-        logger.debug(f"Recorded model load time: {duration:.2f}s")
+        logger.debug("Recorded model load time: %.2fs", duration)
 
     def set_build_info(self, version: str, commit: str = "", build_date: str = ""):
         """Set build information."""
@@ -212,9 +282,32 @@ class PipelineMetrics:
         )
         logger.info(f"Set build info: version={version}, commit={commit}")
 
+    def _get_exposition(self) -> _CachedExposition:
+        """
+        Return the rendered exposition, regenerating it once cache_ttl expires.
+
+        The lock makes concurrent scrapes wait for a single regeneration
+        instead of each walking the registry.
+        """
+        with self._cache_lock:
+            cached = self._cached_exposition
+            now = time.monotonic()
+            if cached is None or now - cached.generated_at >= self.cache_ttl:
+                cached = _CachedExposition(
+                    body=generate_latest(self.registry),
+                    content_type=CONTENT_TYPE_LATEST,
+                    generated_at=now,
+                )
+                self._cached_exposition = cached
+            return cached
+
+    def get_metrics_bytes(self) -> bytes:
+        """Get metrics in Prometheus text format, as the encoded response body."""
+        return self._get_exposition().body
+
     def get_metrics_text(self) -> str:
         """Get metrics in Prometheus text format."""
-        return generate_latest(self.registry).decode("utf-8")
+        return self.get_metrics_bytes().decode("utf-8")
 
     def get_content_type(self) -> str:
         """Get the content type for metrics response."""
@@ -244,37 +337,6 @@ def initialize_metrics(registry: Optional[CollectorRegistry] = None) -> Pipeline
     return _metrics_instance
 
 
-class MetricsHandler(BaseHTTPRequestHandler):
-    """HTTP handler for metrics requests."""
-
-    def __init__(self, metrics: PipelineMetrics, *args, **kwargs):
-        self.metrics = metrics
-        super().__init__(*args, **kwargs)
-
-    def do_GET(self):
-        """Handle GET requests."""
-        if self.path == "/metrics":
-            self.send_response(200)
-            self.send_header("Content-Type", CONTENT_TYPE_LATEST)
-            self.end_headers()
-
-            metrics_text = generate_latest(self.metrics.registry)
-            self.wfile.write(metrics_text)
-        elif self.path == "/health":
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(b'{"status": "healthy"}')
-        else:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(b"Not Found")
-
-    def log_message(self, format, *args):
-        """Override to use our logger."""
-        logger.debug(f"HTTP {format % args}")
-
-
 class MetricsServer:
     """
     HTTP server to expose Prometheus metrics on /metrics endpoint.
@@ -289,35 +351,128 @@ class MetricsServer:
         self.metrics = metrics or get_metrics()
         self.server = None
         self.server_thread = None
+        self._loop = None
         self.running = False
         logger.info(f"Metrics server initialized on port {port}")
 
     def start(self):
-        """Start the metrics server in a background thread."""
+        """Start the metrics server on an event loop in a background thread."""
         if self.running:
             logger.warning("Metrics server is already running")
             return
 
         try:
-            # Use prometheus_client's built-in server
-            start_http_server(self.port, registry=self.metrics.registry)
+            # One event loop serves every scrape, without a thread per connection
+            self._loop = asyncio.new_event_loop()
+            self.server = self._loop.run_until_complete(
+                asyncio.start_server(
+                    self._handle_connection,
+                    "0.0.0.0",
+                    self.port,
+                )
+            )
+            self.server_thread = threading.Thread(
+                target=self._loop.run_forever, name="metrics-server", daemon=True
+            )
+            self.server_thread.start()
             self.running = True
             logger.info(f"Metrics server started on port {self.port}")
             logger.info(f"Metrics available at http://localhost:{self.port}/metrics")
 
         except Exception as e:
             logger.error(f"Failed to start metrics server: {e}")
+            if self._loop is not None:
+                self._loop.close()
+                self._loop = None
+            self.server = None
             raise
 
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer one HTTP request for the metrics or /health."""
+        try:
+            try:
+                request_line = await asyncio.wait_for(
+                    self._read_request(reader), timeout=REQUEST_READ_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.debug("Metrics request timed out")
+                return
+
+            status, body, content_type, extra_headers = self._route(request_line)
+            head = (
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"{extra_headers}"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+
+            # HEAD gets the headers of the GET response, without its body
+            if request_line.split()[:1] == [b"HEAD"]:
+                writer.write(head)
+            else:
+                writer.write(head + body)
+            await writer.drain()
+        except Exception as e:
+            logger.debug("Metrics request failed: %s", e)
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> bytes:
+        """Read the request line and skip the headers, which aren't used."""
+        request_line = await reader.readline()
+        while await reader.readline() not in (b"\r\n", b"\n", b""):
+            pass
+        return request_line
+
+    def _route(self, request_line: bytes) -> Tuple[HTTPStatus, bytes, str, str]:
+        """Status, body, content type and extra headers for a request line."""
+        parts = request_line.split()
+        if len(parts) != 3:
+            return HTTPStatus.BAD_REQUEST, b"Bad Request\n", "text/plain", ""
+
+        method, path = parts[0], parts[1].split(b"?", 1)[0]
+        if path != b"/health" and path not in METRICS_PATHS:
+            return HTTPStatus.NOT_FOUND, b"Not Found\n", "text/plain", ""
+        if method not in (b"GET", b"HEAD"):
+            return (
+                HTTPStatus.METHOD_NOT_ALLOWED,
+                b"Method Not Allowed\n",
+                "text/plain",
+                "Allow: GET, HEAD\r\n",
+            )
+
+        if path == b"/health":
+            return HTTPStatus.OK, b'{"status": "healthy"}', "application/json", ""
+        exposition = self.metrics._get_exposition()
+        return HTTPStatus.OK, exposition.body, exposition.content_type, ""
+
+    async def _close_server(self) -> None:
+        """Stop accepting connections and wait for the listener to close."""
+        self.server.close()
+        await self.server.wait_closed()
+
     def stop(self):
         """Stop the metrics server."""
         if not self.running:
             return
 
+        asyncio.run_coroutine_threadsafe(self._close_server(), self._loop).result(
+            timeout=5
+        )
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self.server_thread.join()
+        self._loop.close()
+        self._loop = None
+        self.server = None
+        self.server_thread = None
         self.running = False
         logger.info("Metrics server stopped")
 
-    def get_metrics_response(self) -> tuple[str, str]:
-        """Get metrics response for manual serving."""
-        metrics_text = generate_latest(self.metrics.registry).decode("utf-8")
-        return metrics_text, CONTENT_TYPE_LATEST
+    def get_metrics_response(self) -> Tuple[bytes, str]:
+        """Get metrics response body and content type for manual serving."""
+        exposition = self.metrics._get_exposition()
+        return exposition.body, exposition.content_type
@@ -5,34 +5,98 @@ a BERT model fine-tuned on financial text for accurate financial
 sentiment classification.
 """
 
+import functools
 import logging
+import os
+import time
+from pathlib import Path
 from typing import Dict, List, Union
 
+import numpy as np
 import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+from huggingface_hub import try_to_load_from_cache
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
 logger = logging.getLogger(__name__)
 
+# Use every CPU this process may run on for intra-op parallelism
+torch.set_num_threads(
+    len(os.sched_getaffinity(0))
+    if hasattr(os, "sched_getaffinity")
+    else os.cpu_count() or 1
+)
+
+# Token limit passed to the tokenizer; longer inputs are truncated
+MAX_TOKENS = 256
+
+# Fields of a sentiment result, in CSV column order
+RESULT_FIELDS = ("label", "confidence", "positive", "negative", "neutral")
+
+# Result for every empty, failed or unscored text; callers get a copy
+_NEUTRAL_RESULT = {
+    "label": "neutral",
+    "confidence": 0.5,
+    "positive": 0.33,
+    "negative": 0.33,
+    "neutral": 0.34,
+}
+
+
+def _is_cached_locally(model_name: str) -> bool:
+    """Check whether the model is a local directory or already in the HF cache."""
+    if Path(model_name).is_dir():
+        return True
+    try:
+        return isinstance(try_to_load_from_cache(model_name, "config.json"), str)
+    except Exception:
+        return False
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_device() -> str:
+    """Probe for the best inference device once per process."""
+    if torch.cuda.is_available():
+        return "cuda"
+    elif hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
+        return "mps"  # Apple Silicon
+    else:
+        return "cpu"
+
 
 class FinBERTSentimentAnalyzer:
     """FinBERT-based sentiment analyzer for financial text."""
 
-    def __init__(self, model_name: str = "ProsusAI/finbert", batch_size: int = 8):
+    def __init__(
+        self,
+        model_name: str = "ProsusAI/finbert",
+        batch_size: int = 8,
+        compile_model: bool = False,
+        precision: str = "fp32",
+        onnx_cache_dir: str = "/data/finbert-onnx",
+    ):
         """
         Initialize the FinBERT sentiment analyzer.
 
         Args:
             model_name: HuggingFace model name for FinBERT
             batch_size: Batch size for processing multiple texts
+            compile_model: Compile the model forward pass with torch.compile
+            precision: Model precision, "fp32", "fp16" (CUDA only), "bf16",
+                "int8" (dynamic quantization, CPU only) or "onnx-int8"
+                (ONNX Runtime quantized model, CPU only, requires optimum)
+            onnx_cache_dir: Directory where the exported ONNX model is cached
         """
         self.model_name = model_name
         self.batch_size = batch_size
+        self.compile_model = compile_model
+        self.precision = precision.lower()
+        self.onnx_cache_dir = onnx_cache_dir
         self.device = self._get_device()
 
         # Initialize model and tokenizer
         self.model = None
         self.tokenizer = None
-        self.pipeline = None
+        self._set_labels([])
 
         # Load model with error handling
         self._load_model()
@@ -42,35 +106,48 @@ class FinBERTSentimentAnalyzer:
             f"device: {self.device}, batch_size: {batch_size}"
         )
 
+    def _set_labels(self, labels: List[str]) -> None:
+        """Store the classification head labels and their array dtype."""
+        self.labels = labels
+        # Unicode dtype wide enough for "neutral" and the longest model label,
+        # so no label is truncated in the result arrays
+        width = max(len(label) for label in [_NEUTRAL_RESULT["label"], *labels])
+        self._label_dtype = f"U{width}"
+        self._label_array = np.array(labels, dtype=self._label_dtype)
+
     def _get_device(self) -> str:
         """Determine the best available device for inference."""
-        if torch.cuda.is_available():
-            return "cuda"
-        elif hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
-            return "mps"  # Apple Silicon
-        else:
-            return "cpu"
+        return _detect_device()
 
     def _load_model(self) -> None:
         """Load FinBERT model and tokenizer with error handling."""
         try:
             logger.info(f"Loading FinBERT model: {self.model_name}")
 
-            # Load tokenizer and model
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = AutoModelForSequenceClassification.from_pretrained(
-                self.model_name
-            )
-
-            # Create sentiment analysis pipeline
-            self.pipeline = pipeline(
-                "sentiment-analysis",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                device=0 if self.device == "cuda" else -1,
-                return_all_scores=True,
-                batch_size=self.batch_size,
-            )
+            # Skip the Hub round trip when the files are already on disk
+            local_files_only = _is_cached_locally(self.model_name)
+            try:
+                self._load_pretrained(local_files_only)
+            except OSError as e:
+                if not local_files_only:
+                    raise
+                # Only part of the model is cached (e.g. config.json without
+                # weights or tokenizer files); fetch the rest from the Hub
+                logger.warning(
+                    f"Incomplete local copy of {self.model_name}, "
+                    f"loading from the Hub: {e}"
+                )
+                self._load_pretrained(local_files_only=False)
+
+            if self.device == "cuda":
+                self.model.to("cuda")
+
+            # Output column order of the classification head
+            id2label = self.model.config.id2label
+            self._set_labels([str(id2label[i]).lower() for i in sorted(id2label)])
+
+            if self.compile_model:
+                self._compile_model()
 
             logger.info("FinBERT model loaded successfully")
 
@@ -78,9 +155,111 @@ class FinBERTSentimentAnalyzer:
             logger.error(f"Failed to load FinBERT model: {e}")
             self.model = None
             self.tokenizer = None
-            self.pipeline = None
             raise
 
+    def _load_pretrained(self, local_files_only: bool) -> None:
+        """Load the tokenizer and model, from local files only if requested."""
+        # Load tokenizer and model; the Rust-backed fast tokenizer is required
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            self.model_name, use_fast=True, local_files_only=local_files_only
+        )
+        if not self.tokenizer.is_fast:
+            raise ValueError(f"No fast tokenizer available for {self.model_name}")
+        self.model = None
+        if self.precision == "onnx-int8":
+            self.model = self._load_onnx_model()
+        if self.model is None:
+            self.model = AutoModelForSequenceClassification.from_pretrained(
+                self.model_name, local_files_only=local_files_only
+            )
+            self.model.eval()
+            self.model = self._apply_precision(self.model)
+
+    def _load_onnx_model(self):
+        """
+        Load an int8-quantized ONNX Runtime export of the model.
+
+        The export and quantization run once and are cached under
+        onnx_cache_dir; later starts load the quantized file directly.
+        Returns None when optimum is not installed or the device is not CPU.
+        """
+        if self.device != "cpu":
+            logger.warning("onnx-int8 precision is only supported on CPU, using fp32")
+            return None
+
+        try:
+            from optimum.onnxruntime import (
+                ORTModelForSequenceClassification,
+                ORTQuantizer,
+            )
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        except ImportError:
+            logger.warning("optimum[onnxruntime] is not installed, using fp32")
+            return None
+
+        cache_dir = Path(self.onnx_cache_dir) / self.model_name.replace("/", "--")
+        quantized_file = "model_quantized.onnx"
+
+        if not (cache_dir / quantized_file).exists():
+            logger.info(f"Exporting FinBERT to ONNX in {cache_dir}")
+            ort_model = ORTModelForSequenceClassification.from_pretrained(
+                self.model_name, export=True
+            )
+            ort_model.save_pretrained(cache_dir)
+            quantizer = ORTQuantizer.from_pretrained(ort_model)
+            quantizer.quantize(
+                save_dir=cache_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(
+                    is_static=False, per_channel=False
+                ),
+            )
+
+        logger.info("Using ONNX Runtime int8 FinBERT")
+        return ORTModelForSequenceClassification.from_pretrained(
+            cache_dir, file_name=quantized_file
+        )
+
+    def _apply_precision(self, model):
+        """Convert the model to the configured precision."""
+        if self.precision == "fp16":
+            if self.device == "cuda":
+                logger.info("Using fp16 FinBERT weights")
+                return model.half()
+            logger.warning("fp16 precision requires CUDA, using fp32")
+        elif self.precision == "bf16":
+            logger.info("Using bf16 FinBERT weights")
+            return model.to(dtype=torch.bfloat16)
+        elif self.precision == "int8":
+            if self.device != "cuda":
+                logger.info("Using dynamically quantized int8 FinBERT")
+                return torch.ao.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            logger.warning("int8 precision is only supported on CPU, using fp32")
+        elif self.precision != "fp32":
+            logger.warning(f"Unknown precision '{self.precision}', using fp32")
+
+        return model
+
+    def _compile_model(self) -> None:
+        """Compile the model forward pass and warm it up on a dummy batch."""
+        eager_forward = self.model.forward
+        try:
+            start_time = time.time()
+            # Compile forward rather than wrapping the module so the model
+            # keeps its regular transformers interface
+            self.model.forward = torch.compile(
+                eager_forward, mode="reduce-overhead", fullgraph=False
+            )
+            # The first call triggers compilation; pay for it here instead of
+            # on the first real batch
+            self._predict(["warmup"] * self.batch_size)
+            logger.info(f"FinBERT model compiled in {time.time() - start_time:.2f}s")
+
+        except Exception as e:
+            self.model.forward = eager_forward
+            logger.warning(f"torch.compile failed, using eager model: {e}")
+
     def _preprocess_text(self, text: str) -> str:
         """
         Preprocess text for FinBERT analysis.
@@ -91,24 +270,59 @@ class FinBERTSentimentAnalyzer:
         Returns:
             Preprocessed text ready for sentiment analysis
         """
-        if not text or not isinstance(text, str):
-            return ""
+        return self._preprocess_batch([text])[0]
 
-        # Basic text cleaning
-        text = text.strip()
+    @staticmethod
+    def _preprocess_batch(texts: List[str]) -> List[str]:
+        """
+        Preprocess a batch of texts for FinBERT analysis.
 
-        # More aggressive truncation for FinBERT's 512 token limit
-        # Use a simple but effective character-based approach
-        # Since we can't rely on tokenizer kwargs, use conservative limits
-        max_chars = 400  # Very conservative to avoid token limit issues
+        Strips whitespace in a single pass; non-string or empty inputs
+        become "". Length is left to the tokenizer, which truncates to
+        MAX_TOKENS.
+        """
+        return [text.strip() if isinstance(text, str) else "" for text in texts]
+
+    def _predict(self, texts: List[str]) -> np.ndarray:
+        """
+        Run FinBERT on texts and return class probabilities per text.
 
-        if len(text) > max_chars:
-            text = text[:max_chars]
-            logger.debug(
-                f"Text truncated to {max_chars} characters to avoid token limits"
+        Tokenizes each batch_size chunk once, padded to its longest text,
+        and runs the model directly instead of going through a pipeline.
+        Returns a (len(texts), len(self.labels)) float64 array.
+        """
+        probabilities = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self.tokenizer(
+                texts[start : start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=MAX_TOKENS,
+                return_tensors="pt",
             )
+            if self.device == "cuda":
+                encoded = encoded.to("cuda")
+
+            with torch.inference_mode():
+                logits = self.model(**encoded).logits
+            probabilities.append(torch.softmax(logits.float(), dim=-1).cpu().numpy())
+
+        return np.concatenate(probabilities).astype(np.float64)
+
+    @staticmethod
+    def _to_result(sentiment_scores: Dict[str, float]) -> Dict[str, Union[str, float]]:
+        """Convert per-label scores to the standardized result format."""
+        # Determine dominant sentiment
+        dominant_label = max(sentiment_scores, key=sentiment_scores.get)
+        confidence = sentiment_scores[dominant_label]
 
-        return text
+        return {
+            "label": dominant_label,
+            "confidence": confidence,
+            "positive": sentiment_scores.get("positive", 0.0),
+            "negative": sentiment_scores.get("negative", 0.0),
+            "neutral": sentiment_scores.get("neutral", 0.0),
+        }
 
     def analyze_sentiment(self, text: str) -> Dict[str, Union[str, float]]:
         """
@@ -120,79 +334,24 @@ class FinBERTSentimentAnalyzer:
         Returns:
             Dictionary with sentiment label and confidence scores
         """
-        if not self.pipeline:
+        if self.model is None:
             logger.warning("FinBERT model not loaded, returning neutral sentiment")
-            return {
-                "label": "neutral",
-                "confidence": 0.5,
-                "positive": 0.33,
-                "negative": 0.33,
-                "neutral": 0.34,
-            }
+            return dict(_NEUTRAL_RESULT)
 
         try:
             # Preprocess text
             processed_text = self._preprocess_text(text)
 
             if not processed_text:
-                return {
-                    "label": "neutral",
-                    "confidence": 0.5,
-                    "positive": 0.33,
-                    "negative": 0.33,
-                    "neutral": 0.34,
-                }
-
-            # Get predictions with error handling for token limits
-            try:
-                results = self.pipeline(processed_text)[0]  # First (and only) result
-            except Exception as pipeline_e:
-                if (
-                    "token" in str(pipeline_e).lower()
-                    or "length" in str(pipeline_e).lower()
-                ):
-                    logger.warning(
-                        f"Token length issue, further truncating text: {pipeline_e}"
-                    )
-                    # Further truncate and retry
-                    if len(processed_text) > 500:
-                        processed_text = processed_text[:500]
-                        results = self.pipeline(processed_text)[0]
-                    else:
-                        raise pipeline_e
-                else:
-                    raise pipeline_e
-
-            # Convert to standardized format
-            sentiment_scores = {}
-            for result in results:
-                label = result["label"].lower()
-                score = result["score"]
-                sentiment_scores[label] = score
-
-            # Determine dominant sentiment
-            dominant_label = max(
-                sentiment_scores.keys(), key=lambda k: sentiment_scores[k]
-            )
-            confidence = sentiment_scores[dominant_label]
+                return dict(_NEUTRAL_RESULT)
 
-            return {
-                "label": dominant_label,
-                "confidence": confidence,
-                "positive": sentiment_scores.get("positive", 0.0),
-                "negative": sentiment_scores.get("negative", 0.0),
-                "neutral": sentiment_scores.get("neutral", 0.0),
-            }
+            # Tokenizer truncation keeps the input within the model limit
+            probabilities = self._predict([processed_text])[0].tolist()
+            return self._to_result(dict(zip(self.labels, probabilities)))
 
         except Exception as e:
             logger.error(f"Error analyzing sentiment: {e}")
-            return {
-                "label": "neutral",
-                "confidence": 0.5,
-                "positive": 0.33,
-                "negative": 0.33,
-                "neutral": 0.34,
-            }
+            return dict(_NEUTRAL_RESULT)
 
     def analyze_batch(self, texts: List[str]) -> List[Dict[str, Union[str, float]]]:
         """
@@ -202,110 +361,85 @@ class FinBERTSentimentAnalyzer:
             texts: List of texts to analyze
 
         Returns:
-            List of sentiment analysis results
+            List of sentiment analysis results, in the same order as texts
+        """
+        if self.model is None:
+            logger.warning("FinBERT model not loaded, returning neutral sentiments")
+            return [dict(_NEUTRAL_RESULT) for _ in texts]
+
+        arrays = self.analyze_batch_arrays(texts)
+        columns = [arrays[field].tolist() for field in RESULT_FIELDS]
+        return [dict(zip(RESULT_FIELDS, row)) for row in zip(*columns)]
+
+    @staticmethod
+    def _neutral_arrays(size: int, label_dtype: str) -> Dict[str, np.ndarray]:
+        """Build result columns with every row set to neutral sentiment."""
+        arrays = {
+            field: np.full(size, _NEUTRAL_RESULT[field]) for field in RESULT_FIELDS
+        }
+        arrays["label"] = arrays["label"].astype(label_dtype)
+        return arrays
+
+    def analyze_batch_arrays(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Analyze sentiment for a batch of texts as one array per result field.
+
+        Args:
+            texts: List of texts to analyze
+
+        Returns:
+            Dictionary mapping each of RESULT_FIELDS to an array with one
+            entry per text, in the same order as texts
         """
-        if not self.pipeline:
+        arrays = self._neutral_arrays(len(texts), self._label_dtype)
+        if self.model is None:
             logger.warning("FinBERT model not loaded, returning neutral sentiments")
-            return [
-                {
-                    "label": "neutral",
-                    "confidence": 0.5,
-                    "positive": 0.33,
-                    "negative": 0.33,
-                    "neutral": 0.34,
-                }
-                for _ in texts
-            ]
+            return arrays
 
         try:
-            # Preprocess all texts
-            processed_texts = [self._preprocess_text(text) for text in texts]
-
-            # Filter out empty texts and keep track of indices
-            valid_texts = []
-            valid_indices = []
-            for i, text in enumerate(processed_texts):
-                if text:
-                    valid_texts.append(text)
-                    valid_indices.append(i)
-
-            results = [None] * len(texts)
-
-            if valid_texts:
-                # Batch processing with individual error handling
-                batch_results = []
-                try:
-                    batch_results = self.pipeline(valid_texts)
-                except Exception as e:
-                    logger.warning(
-                        "Batch processing failed, falling back to "
-                        f"individual processing: {e}"
-                    )
-                    # Fallback to individual processing
-                    for text in valid_texts:
-                        try:
-                            individual_result = self.pipeline(text)
-                            batch_results.append(individual_result[0])
-                        except Exception as individual_e:
-                            logger.warning(
-                                f"Individual text processing failed: {individual_e}"
-                            )
-                            # Add neutral result for failed individual text
-                            batch_results.append(
-                                [
-                                    {"label": "neutral", "score": 0.34},
-                                    {"label": "positive", "score": 0.33},
-                                    {"label": "negative", "score": 0.33},
-                                ]
-                            )
-
-                # Process results
-                for idx, batch_result in zip(valid_indices, batch_results):
-                    sentiment_scores = {}
-                    for result in batch_result:
-                        label = result["label"].lower()
-                        score = result["score"]
-                        sentiment_scores[label] = score
-
-                    # Determine dominant sentiment
-                    dominant_label = max(
-                        sentiment_scores.keys(), key=lambda k: sentiment_scores[k]
-                    )
-                    confidence = sentiment_scores[dominant_label]
-
-                    results[idx] = {
-                        "label": dominant_label,
-                        "confidence": confidence,
-                        "positive": sentiment_scores.get("positive", 0.0),
-                        "negative": sentiment_scores.get("negative", 0.0),
-                        "neutral": sentiment_scores.get("neutral", 0.0),
-                    }
-
-            # Fill in None results with neutral sentiment
-            for i in range(len(results)):
-                if results[i] is None:
-                    results[i] = {
-                        "label": "neutral",
-                        "confidence": 0.5,
-                        "positive": 0.33,
-                        "negative": 0.33,
-                        "neutral": 0.34,
-                    }
-
-            return results
+            # Preprocess all texts and keep the indices of non-empty ones
+            processed_texts = self._preprocess_batch(texts)
+            valid_indices = [i for i, text in enumerate(processed_texts) if text]
+            if not valid_indices:
+                return arrays
+
+            valid_texts = [processed_texts[i] for i in valid_indices]
+            try:
+                probabilities = self._predict(valid_texts)
+            except Exception as e:
+                logger.warning(
+                    "Batch processing failed, falling back to "
+                    f"individual processing: {e}"
+                )
+                probabilities = np.array(
+                    [self._predict_single(text) for text in valid_texts]
+                )
+
+            # Dominant label and per-label columns, computed column-wise
+            top = probabilities.argmax(axis=1)
+            arrays["label"][valid_indices] = self._label_array[top]
+            arrays["confidence"][valid_indices] = probabilities.max(axis=1)
+            for label in ("positive", "negative", "neutral"):
+                arrays[label][valid_indices] = (
+                    probabilities[:, self.labels.index(label)]
+                    if label in self.labels
+                    else 0.0
+                )
+
+            return arrays
 
         except Exception as e:
             logger.error(f"Error in batch sentiment analysis: {e}")
-            return [
-                {
-                    "label": "neutral",
-                    "confidence": 0.5,
-                    "positive": 0.33,
-                    "negative": 0.33,
-                    "neutral": 0.34,
-                }
-                for _ in texts
-            ]
+            return self._neutral_arrays(len(texts), self._label_dtype)
+
+    def _predict_single(self, text: str) -> List[float]:
+        """Score one text, falling back to neutral probabilities on error."""
+        try:
+            return self._predict([text])[0].tolist()
+        except Exception as e:
+            logger.warning(f"Individual text processing failed: {e}")
+            neutral = {"neutral": 0.34, "positive": 0.33, "negative": 0.33}
+            return [neutral.get(label, 0.0) for label in self.labels]
 
     def get_model_info(self) -> Dict[str, str]:
         """Get information about the loaded model."""
@@ -313,5 +447,5 @@ class FinBERTSentimentAnalyzer:
             "model_name": self.model_name,
             "device": self.device,
             "batch_size": str(self.batch_size),
-            "model_loaded": str(self.pipeline is not None),
+            "model_loaded": str(self.model is not None),
         }
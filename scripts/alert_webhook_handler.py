@@ -2,30 +2,258 @@
 """
 Alert Webhook Handler for Reddit Sentiment Pipeline
 Handles incoming alerts from Prometheus/Alertmanager and creates GitHub issues
+
+Served by gunicorn; running the script directly execs the equivalent of:
+    gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:8080 \
+        --chdir scripts 'alert_webhook_handler:create_app()'
 """
 
+import atexit
 import hashlib
+import hmac
 import json
 import logging
+import logging.handlers
 import os
+import queue
 import sys
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import requests
-from flask import Flask, jsonify, request
+from dotenv import load_dotenv
+from flask import Flask, request
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    # Optional faster JSON codec; the stdlib json module is used without it
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Load the project .env before the webhook handler reads GITHUB_TOKEN_PAT;
+# variables already set in the environment take precedence
+ENV_FILE = Path("/home/yasar/cicd_project/.env")
+load_dotenv(ENV_FILE, override=False)
+
+# Alerts from one Alertmanager payload processed concurrently
+ALERT_WORKERS = 8
+
+# Webhook payloads processed in the background after being acknowledged
+WEBHOOK_WORKERS = 8
+
+# Seconds an alert ID -> issue number lookup is reused; misses expire sooner
+ISSUE_CACHE_TTL = 60
+ISSUE_CACHE_MISS_TTL = 10
+ISSUE_CACHE_SIZE = 1024
+
+# Requests kept in reserve in a GitHub rate limit window before waiting for
+# the window to reset (capped at a tenth of the window's limit)
+RATE_LIMIT_RESERVE = 50
+
+# Headers shared by every GitHub API request; the token is added per manager
+_SESSION_HEADERS = {
+    "Accept": "application/vnd.github.v3+json",
+    "Content-Type": "application/json",
+}
+
+# Seconds an issue list ETag and its result are kept for conditional requests
+ISSUE_ETAG_TTL = 3600
+
+# Only match alert issues updated within this many hours (0 = no limit)
+ISSUE_LOOKBACK_HOURS = int(os.getenv("ALERT_ISSUE_LOOKBACK_HOURS", "0"))
+
+# Labels on every alert issue; severity/service/component labels are appended
+_BASE_LABELS = ("alert", "monitoring", "automated")
+
+_SEVERITY_EMOJI = {"critical": "🚨", "warning": "⚠️", "info": "ℹ️"}
+
+# Issue body for a firing alert, rendered with str.format_map
+_ISSUE_BODY_TEMPLATE = """## {severity_emoji} Alert: {alert_name}
+
+**Severity:** {severity}  
+**Service:** {service}  
+**Status:** FIRING  
+**Started:** {started}
+
+### Description
+{description}
+
+### Alert Details
+{details}
+### 🔧 Resolution Steps
+
+1. **Check Service Status**
+   ```bash
+   systemctl status {service}
+   journalctl -u {service} -f
+   ```
+
+2. **Monitor Metrics**
+   - [Grafana Dashboard](http://localhost:3000/d/reddit-sentiment-pipeline)
+   - [Prometheus Targets](http://localhost:9090/targets)
+
+3. **Follow Runbook**
+   {runbook}
+
+4. **Update This Issue**
+   - Add investigation findings
+   - Document resolution steps
+   - Close when resolved
+
+### 📊 Monitoring Links
+- [Grafana Dashboard](http://localhost:3000/d/reddit-sentiment-pipeline)
+- [Prometheus Alerts](http://localhost:9090/alerts)
+- [Service Logs](http://localhost:3000/explore)
+
+---
+**Alert ID:** {alert_id}  
+**Auto-created by monitoring system**
+"""
+
+_MISSING = object()
+
+
+# Background thread writing queued log records, and the process it runs in
+log_listener: Optional[logging.handlers.QueueListener] = None
+_log_pid: Optional[int] = None
+
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
+def setup_logging() -> None:
+    """Configure logging for this process, once
+
+    Records are queued by the request threads and written to the file and
+    console by a background listener thread. A queue handler inherited
+    through a fork is replaced, as its listener thread only exists in the
+    parent process.
+    """
+    global log_listener, _log_pid
+    if _log_pid == os.getpid():
+        return
+
+    for handler in list(logging.root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logging.root.removeHandler(handler)
+
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    handlers = [
         logging.FileHandler("/home/cayir/cicd_project/logs/alert_webhook.log"),
         logging.StreamHandler(),
-    ],
-)
-logger = logging.getLogger(__name__)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+
+    logging.root.setLevel(logging.INFO)
+    logging.root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _log_pid = os.getpid()
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time as shown in issue bodies and comments"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+
+
+class _TTLCache:
+    """Small thread-safe mapping whose entries expire after a per-entry TTL"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: Dict[str, Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return default
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.maxsize:
+                # Evict the oldest entry; dicts keep insertion order
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (value, time.monotonic() + ttl)
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+def _encode_issue(title: str, body: str, labels: List[str]) -> bytes:
+    """Serialize a new issue request body, with orjson when available"""
+    issue_data = {
+        "title": title,
+        "body": body,
+        "labels": labels,
+        "assignees": ["YasCay"],
+    }
+    return orjson.dumps(issue_data) if orjson else json.dumps(issue_data).encode()
+
+
+class RateLimiter:
+    """Tracks GitHub rate limit headers and waits before a window runs dry"""
+
+    def __init__(self, reserve: int = RATE_LIMIT_RESERVE):
+        self.reserve = reserve
+        # Resource ("core", "search") -> (remaining, limit, reset timestamp)
+        self._windows: Dict[str, Tuple[int, int, float]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, response: requests.Response, **kwargs) -> None:
+        """Record the rate limit headers of a response (requests hook)"""
+        headers = response.headers
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+
+        resource = headers.get("X-RateLimit-Resource", "core")
+        limit = int(headers.get("X-RateLimit-Limit", remaining))
+        with self._lock:
+            self._windows[resource] = (int(remaining), limit, float(reset))
+
+    def wait(self, resource: str = "core") -> None:
+        """Sleep until the window resets if it is down to the reserve"""
+        with self._lock:
+            window = self._windows.get(resource)
+        if window is None:
+            return
+
+        remaining, limit, reset_ts = window
+        if remaining > min(self.reserve, limit // 10):
+            return
+
+        delay = reset_ts - time.time()
+        if delay > 0:
+            logger.warning(
+                f"GitHub {resource} rate limit low ({remaining} left), "
+                f"waiting {delay:.0f}s for reset"
+            )
+            time.sleep(delay)
+
+
+# Shared by every manager in the process; the limits are per token
+github_rate_limiter = RateLimiter()
 
 
 class GitHubIssueManager:
@@ -35,64 +263,122 @@ class GitHubIssueManager:
         self.token = token
         self.repository = repository
         self.api_base = "https://api.github.com"
-        self.headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github.v3+json",
-            "Content-Type": "application/json",
-        }
+        self.headers = {**_SESSION_HEADERS, "Authorization": f"Bearer {token}"}
 
-    def create_github_issue(self, alert_data: Dict[str, Any]) -> Optional[int]:
+        # Recent alert ID -> open issue number lookups, None for no issue
+        self._issue_cache = _TTLCache(ISSUE_CACHE_SIZE)
+        # Issue list query -> (ETag, issue number) for If-None-Match requests
+        self._issue_etags = _TTLCache(ISSUE_CACHE_SIZE)
+
+        # Alert ID -> (lock, holders), so only one thread in this process at
+        # a time looks up and creates the issue for an alert
+        self._alert_locks: Dict[str, Tuple[threading.Lock, int]] = {}
+        self._alert_locks_guard = threading.Lock()
+
+        # Resolution comments posted alongside the close request
+        self._comment_executor = ThreadPoolExecutor(
+            max_workers=ALERT_WORKERS, thread_name_prefix="issue-comment"
+        )
+
+        # Pooled keep-alive connections to the GitHub API, with retries on
+        # rate limiting and transient gateway errors. POST is not retried so
+        # a gateway error can never create the same issue twice.
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"PATCH"},
+        )
+        self.session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=50, pool_maxsize=50, max_retries=retry),
+        )
+        self.rate_limiter = github_rate_limiter
+        self.session.hooks["response"].append(self.rate_limiter.update)
+
+    def create_github_issue(
+        self, alert_data: Dict[str, Any], timestamp: Optional[str] = None
+    ) -> Optional[int]:
         """Create a new GitHub issue for an alert"""
         try:
             # Generate issue title and body
             title = self._generate_issue_title(alert_data)
-            body = self._generate_issue_body(alert_data)
+            body = self._generate_issue_body(alert_data, timestamp)
             labels = self._get_issue_labels(alert_data)
 
-            # Check if issue already exists
-            existing_issue = self._find_existing_issue(alert_data)
-            if existing_issue:
-                logger.info(f"Issue already exists: #{existing_issue}")
-                return existing_issue
-
-            # Create new issue
-            issue_data = {
-                "title": title,
-                "body": body,
-                "labels": labels,
-                "assignees": ["YasCay"],
-            }
+            # Concurrent firings of the same alert in this process wait here,
+            # then find the issue the first one created. Other workers find
+            # it through its alert ID label, which the issue list returns as
+            # soon as the issue exists; only a firing that looks up before
+            # another worker's create request completes can still open a
+            # second issue.
+            alert_id = self._generate_alert_id(alert_data)
+            with self._alert_lock(alert_id):
+                # Check if issue already exists
+                existing_issue = self._find_existing_issue(alert_data)
+                if existing_issue:
+                    logger.info(f"Issue already exists: #{existing_issue}")
+                    return existing_issue
 
-            url = f"{self.api_base}/repos/{self.repository}/issues"
-            response = requests.post(url, headers=self.headers, json=issue_data)
+                # Create new issue
+                issue_data = _encode_issue(title, body, labels)
 
-            if response.status_code == 201:
-                issue_number = response.json()["number"]
-                logger.info(f"Created GitHub issue #{issue_number}")
-                return issue_number
-            else:
-                logger.error(
-                    f"Failed to create issue: {response.status_code} - {response.text}"
-                )
-                return None
+                url = f"{self.api_base}/repos/{self.repository}/issues"
+                self.rate_limiter.wait()
+                response = self.session.post(url, data=issue_data)
+
+                if response.status_code == 201:
+                    issue_number = response.json()["number"]
+                    logger.info(f"Created GitHub issue #{issue_number}")
+                    self._issue_cache.set(alert_id, issue_number, ISSUE_CACHE_TTL)
+                    return issue_number
+                else:
+                    logger.error(
+                        "Failed to create issue: "
+                        f"{response.status_code} - {response.text}"
+                    )
+                    return None
 
         except Exception as e:
             logger.error(f"Error creating GitHub issue: {e}")
             return None
 
+    @contextmanager
+    def _alert_lock(self, alert_id: str) -> Iterator[None]:
+        """Hold the lock for one alert ID, dropping it once no thread needs it"""
+        with self._alert_locks_guard:
+            lock, holders = self._alert_locks.get(alert_id, (threading.Lock(), 0))
+            self._alert_locks[alert_id] = (lock, holders + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._alert_locks_guard:
+                lock, holders = self._alert_locks[alert_id]
+                if holders == 1:
+                    del self._alert_locks[alert_id]
+                else:
+                    self._alert_locks[alert_id] = (lock, holders - 1)
+
     def update_github_issue(
-        self, issue_number: int, alert_data: Dict[str, Any]
+        self,
+        issue_number: int,
+        alert_data: Dict[str, Any],
+        timestamp: Optional[str] = None,
     ) -> bool:
         """Update an existing GitHub issue with new alert information"""
         try:
             # Generate update comment
-            comment = self._generate_update_comment(alert_data)
+            comment = self._generate_update_comment(alert_data, timestamp)
 
             # Add comment to issue
             comment_data = {"body": comment}
             url = f"{self.api_base}/repos/{self.repository}/issues/{issue_number}/comments"
 
-            response = requests.post(url, headers=self.headers, json=comment_data)
+            self.rate_limiter.wait()
+            response = self.session.post(url, json=comment_data)
 
             if response.status_code == 201:
                 logger.info(f"Updated GitHub issue #{issue_number}")
@@ -108,22 +394,34 @@ class GitHubIssueManager:
             return False
 
     def close_resolved_issue(
-        self, issue_number: int, alert_data: Dict[str, Any]
+        self,
+        issue_number: int,
+        alert_data: Dict[str, Any],
+        timestamp: Optional[str] = None,
     ) -> bool:
         """Close a GitHub issue when alert is resolved"""
         try:
             # Add resolution comment
-            resolution_comment = self._generate_resolution_comment(alert_data)
-            self._add_comment(issue_number, resolution_comment)
+            resolution_comment = self._generate_resolution_comment(
+                alert_data, timestamp
+            )
+            # Post the comment while closing the issue; the two calls are
+            # independent, so this saves one round trip
+            comment_future = self._comment_executor.submit(
+                self._add_comment, issue_number, resolution_comment
+            )
 
             # Close the issue
             issue_data = {"state": "closed"}
             url = f"{self.api_base}/repos/{self.repository}/issues/{issue_number}"
 
-            response = requests.patch(url, headers=self.headers, json=issue_data)
+            self.rate_limiter.wait()
+            response = self.session.patch(url, json=issue_data)
+            comment_future.result()
 
             if response.status_code == 200:
                 logger.info(f"Closed GitHub issue #{issue_number}")
+                self._issue_cache.pop(self._generate_alert_id(alert_data))
                 return True
             else:
                 logger.error(
@@ -143,84 +441,47 @@ class GitHubIssueManager:
 
         return f"{severity}: {alert_name} - {service}"
 
-    def _generate_issue_body(self, alert_data: Dict[str, Any]) -> str:
+    def _generate_issue_body(
+        self, alert_data: Dict[str, Any], timestamp: Optional[str] = None
+    ) -> str:
         """Generate issue body from alert data"""
-        alert_name = alert_data.get("alertname", "Unknown Alert")
         severity = alert_data.get("severity", "unknown")
-        service = alert_data.get("service", "unknown-service")
-        description = alert_data.get("description", "No description provided")
         runbook_url = alert_data.get("runbook_url", "")
 
-        # Severity emoji
-        severity_emoji = {"critical": "🚨", "warning": "⚠️", "info": "ℹ️"}.get(
-            severity.lower(), "❓"
-        )
-
-        body = f"""## {severity_emoji} Alert: {alert_name}
-
-**Severity:** {severity.upper()}  
-**Service:** {service}  
-**Status:** FIRING  
-**Started:** {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")}
-
-### Description
-{description}
-
-### Alert Details
-"""
-
-        # Add instance details if available
+        # Optional sections between the description and the resolution steps
+        details = []
         if "instances" in alert_data:
-            body += "\n**Affected Instances:**\n"
-            for instance in alert_data["instances"]:
-                body += f"- {instance.get('instance', 'unknown')}\n"
-
-        # Add metrics if available
+            details.append("\n**Affected Instances:**\n")
+            details.extend(
+                f"- {instance.get('instance', 'unknown')}\n"
+                for instance in alert_data["instances"]
+            )
         if "value" in alert_data:
-            body += f"\n**Current Value:** {alert_data['value']}\n"
-
-        # Add runbook link
+            details.append(f"\n**Current Value:** {alert_data['value']}\n")
         if runbook_url:
-            body += f"\n### 📚 Runbook\n[Resolution Guide]({runbook_url})\n"
-
-        # Add resolution steps
-        body += f"""
-### 🔧 Resolution Steps
-
-1. **Check Service Status**
-   ```bash
-   systemctl status {service}
-   journalctl -u {service} -f
-   ```
-
-2. **Monitor Metrics**
-   - [Grafana Dashboard](http://localhost:3000/d/reddit-sentiment-pipeline)
-   - [Prometheus Targets](http://localhost:9090/targets)
-
-3. **Follow Runbook**
-   {runbook_url if runbook_url else "See monitoring runbook for detailed procedures"}
-
-4. **Update This Issue**
-   - Add investigation findings
-   - Document resolution steps
-   - Close when resolved
-
-### 📊 Monitoring Links
-- [Grafana Dashboard](http://localhost:3000/d/reddit-sentiment-pipeline)
-- [Prometheus Alerts](http://localhost:9090/alerts)
-- [Service Logs](http://localhost:3000/explore)
-
----
-**Alert ID:** {self._generate_alert_id(alert_data)}  
-**Auto-created by monitoring system**
-"""
-
-        return body
+            details.append(f"\n### 📚 Runbook\n[Resolution Guide]({runbook_url})\n")
+
+        return _ISSUE_BODY_TEMPLATE.format_map(
+            {
+                "severity_emoji": _SEVERITY_EMOJI.get(severity.lower(), "❓"),
+                "alert_name": alert_data.get("alertname", "Unknown Alert"),
+                "severity": severity.upper(),
+                "service": alert_data.get("service", "unknown-service"),
+                "started": timestamp or _utc_timestamp(),
+                "description": alert_data.get("description", "No description provided"),
+                "details": "".join(details),
+                "runbook": runbook_url
+                or "See monitoring runbook for detailed procedures",
+                "alert_id": self._generate_alert_id(alert_data),
+            }
+        )
 
-    def _generate_update_comment(self, alert_data: Dict[str, Any]) -> str:
+    def _generate_update_comment(
+        self, alert_data: Dict[str, Any], timestamp: Optional[str] = None
+    ) -> str:
         """Generate update comment for existing issue"""
         status = alert_data.get("status", "unknown")
-        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+        timestamp = timestamp or _utc_timestamp()
 
         if status.lower() == "firing":
             return f"""## 🔥 Alert Still Firing
@@ -243,9 +504,11 @@ The alert is still active. Please continue investigation.
 Alert status has changed. Please verify resolution.
 """
 
-    def _generate_resolution_comment(self, alert_data: Dict[str, Any]) -> str:
+    def _generate_resolution_comment(
+        self, alert_data: Dict[str, Any], timestamp: Optional[str] = None
+    ) -> str:
         """Generate resolution comment when alert is resolved"""
-        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+        timestamp = timestamp or _utc_timestamp()
 
         return f"""## ✅ Alert Resolved
 
@@ -262,40 +525,69 @@ The issue appears to have been resolved. Please verify that the service is funct
 
     def _get_issue_labels(self, alert_data: Dict[str, Any]) -> List[str]:
         """Get appropriate labels for the issue"""
-        labels = ["alert", "monitoring", "automated"]
-
         severity = alert_data.get("severity", "").lower()
-        if severity:
-            labels.append(f"severity-{severity}")
-
         service = alert_data.get("service", "")
-        if service:
-            labels.append(f"service-{service}")
-
         component = alert_data.get("component", "")
-        if component:
-            labels.append(f"component-{component}")
 
-        return labels
+        return [
+            *_BASE_LABELS,
+            *([f"severity-{severity}"] if severity else []),
+            *([f"service-{service}"] if service else []),
+            *([f"component-{component}"] if component else []),
+            f"alert-{self._generate_alert_id(alert_data)}",
+        ]
 
     def _find_existing_issue(self, alert_data: Dict[str, Any]) -> Optional[int]:
         """Find existing issue for the same alert"""
         try:
             alert_id = self._generate_alert_id(alert_data)
 
-            # Search for issues with the alert ID
-            url = f"{self.api_base}/repos/{self.repository}/issues"
-            params = {"state": "open", "labels": "alert,monitoring", "per_page": 100}
-
-            response = requests.get(url, headers=self.headers, params=params)
+            cached = self._issue_cache.get(alert_id, _MISSING)
+            if cached is not _MISSING:
+                return cached
 
-            if response.status_code == 200:
-                issues = response.json()
-                for issue in issues:
-                    if alert_id in issue.get("body", ""):
-                        return issue["number"]
+            # List open issues by their alert ID label. Unlike the search
+            # index, the issue list includes an issue as soon as it is created.
+            url = f"{self.api_base}/repos/{self.repository}/issues"
+            params = {
+                "state": "open",
+                "labels": f"alert,alert-{alert_id}",
+                "sort": "updated",
+                "direction": "desc",
+                # Only the most recently updated match is used
+                "per_page": 1,
+            }
+            if ISSUE_LOOKBACK_HOURS > 0:
+                since = datetime.now(timezone.utc) - timedelta(
+                    hours=ISSUE_LOOKBACK_HOURS
+                )
+                # Whole hours keep the query, and so its ETag, stable
+                params["since"] = since.strftime("%Y-%m-%dT%H:00:00Z")
+            query = "&".join(f"{key}={value}" for key, value in params.items())
+
+            # Unchanged results come back as a 304 that skips the rate limit
+            conditional = self._issue_etags.get(query)
+            headers = {"If-None-Match": conditional[0]} if conditional else {}
+
+            self.rate_limiter.wait()
+            response = self.session.get(url, params=params, headers=headers)
+
+            if response.status_code == 304 and conditional:
+                issue_number = conditional[1]
+            elif response.status_code == 200:
+                items = response.json()
+                issue_number = items[0]["number"] if items else None
+                etag = response.headers.get("ETag")
+                if etag:
+                    self._issue_etags.set(query, (etag, issue_number), ISSUE_ETAG_TTL)
+            else:
+                return None
 
-            return None
+            if issue_number is None:
+                self._issue_cache.set(alert_id, None, ISSUE_CACHE_MISS_TTL)
+            else:
+                self._issue_cache.set(alert_id, issue_number, ISSUE_CACHE_TTL)
+            return issue_number
 
         except Exception as e:
             logger.error(f"Error finding existing issue: {e}")
@@ -307,8 +599,9 @@ The issue appears to have been resolved. Please verify that the service is funct
         service = alert_data.get("service", "")
         instance = alert_data.get("instance", "")
 
+        # 4-byte BLAKE2b digest, i.e. 8 hex chars; a tag, not a security hash
         combined = f"{alert_name}-{service}-{instance}"
-        return hashlib.md5(combined.encode()).hexdigest()[:8]
+        return hashlib.blake2b(combined.encode(), digest_size=4).hexdigest()
 
     def _add_comment(self, issue_number: int, comment: str) -> bool:
         """Add comment to issue"""
@@ -316,7 +609,8 @@ The issue appears to have been resolved. Please verify that the service is funct
             comment_data = {"body": comment}
             url = f"{self.api_base}/repos/{self.repository}/issues/{issue_number}/comments"
 
-            response = requests.post(url, headers=self.headers, json=comment_data)
+            self.rate_limiter.wait()
+            response = self.session.post(url, json=comment_data)
             return response.status_code == 201
 
         except Exception as e:
@@ -324,11 +618,22 @@ The issue appears to have been resolved. Please verify that the service is funct
             return False
 
 
+def _alert_priority(alert: Dict[str, Any]) -> int:
+    """Processing order: critical firing, other firing, then the rest"""
+    if alert.get("status", "").lower() != "firing":
+        return 2
+    severity = alert.get("labels", {}).get("severity", "").lower()
+    return 0 if severity == "critical" else 1
+
+
 class AlertWebhookHandler:
     """Main webhook handler for processing alerts"""
 
     def __init__(self):
         self.github_manager = None
+        self._alert_executor = ThreadPoolExecutor(
+            max_workers=ALERT_WORKERS, thread_name_prefix="alert"
+        )
         self._initialize_github_manager()
 
     def _initialize_github_manager(self):
@@ -351,15 +656,28 @@ class AlertWebhookHandler:
     def handle_webhook(self, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle incoming webhook from Alertmanager"""
         try:
-            logger.info(f"Received webhook: {json.dumps(webhook_data, indent=2)}")
-
-            # Process each alert in the webhook
-            results = []
-
             alerts = webhook_data.get("alerts", [])
-            for alert in alerts:
-                result = self._process_alert(alert)
-                results.append(result)
+            logger.info(
+                "Received webhook from %s with %d alerts",
+                webhook_data.get("receiver", "unknown"),
+                len(alerts),
+            )
+            # The full payload is only serialized when debug logging is on
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Webhook payload: %s",
+                    json.dumps(webhook_data, separators=(",", ":")),
+                )
+
+            # Process the alerts concurrently; their GitHub calls are I/O bound.
+            # Critical firing alerts are submitted first in case the rate
+            # limit forces the rest to wait.
+            order = sorted(range(len(alerts)), key=lambda i: _alert_priority(alerts[i]))
+            futures = {
+                i: self._alert_executor.submit(self._process_alert, alerts[i])
+                for i in order
+            }
+            results = [futures[i].result() for i in range(len(alerts))]
 
             return {
                 "status": "success",
@@ -394,9 +712,14 @@ class AlertWebhookHandler:
             if not self.github_manager:
                 return {"status": "error", "error": "GitHub manager not initialized"}
 
+            # One timestamp for every issue body or comment this alert produces
+            timestamp = _utc_timestamp()
+
             if status.lower() == "firing":
                 # Create or update issue for firing alert
-                issue_number = self.github_manager.create_github_issue(alert_data)
+                issue_number = self.github_manager.create_github_issue(
+                    alert_data, timestamp
+                )
                 if issue_number:
                     return {
                         "status": "success",
@@ -411,7 +734,7 @@ class AlertWebhookHandler:
                 existing_issue = self.github_manager._find_existing_issue(alert_data)
                 if existing_issue:
                     success = self.github_manager.close_resolved_issue(
-                        existing_issue, alert_data
+                        existing_issue, alert_data, timestamp
                     )
                     if success:
                         return {
@@ -441,7 +764,13 @@ def send_notification(alert_data: Dict[str, Any], channel: str = "github") -> bo
     """Send notification through specified channel"""
     try:
         if channel == "github":
-            handler = AlertWebhookHandler()
+            # Reuse the process handler and its pooled GitHub session when
+            # serving; one-off calls build a handler of their own
+            handler = (
+                webhook_handler
+                if _handler_pid == os.getpid()
+                else AlertWebhookHandler()
+            )
             if handler.github_manager:
                 issue_number = handler.github_manager.create_github_issue(alert_data)
                 return issue_number is not None
@@ -454,65 +783,151 @@ def send_notification(alert_data: Dict[str, Any], channel: str = "github") -> bo
         return False
 
 
-# Flask app for webhook endpoint
+def _log_webhook_result(future) -> None:
+    """Log the outcome of a webhook processed in the background"""
+    result = future.result()
+    logger.info(
+        f"Processed queued webhook: {result.get('status')} "
+        f"({result.get('processed_alerts', 0)} alerts)"
+    )
+
+
+# Shared secret for HMAC-SHA256 signed webhooks; unsigned requests are
+# accepted when it is not set
+WEBHOOK_SECRET = os.getenv("ALERT_WEBHOOK_SECRET", "").encode()
+
+
+def _valid_signature(payload: bytes, signature: Optional[str]) -> bool:
+    """Check an X-Hub-Signature-256 header against the shared webhook secret"""
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(WEBHOOK_SECRET, payload, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature[len("sha256=") :], expected)
+
+
+def _loads(data: bytes) -> Any:
+    """Parse a JSON request body, with orjson when available"""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _json_response(payload: Dict[str, Any], status: int = 200):
+    """Build a JSON response, serialized with orjson when available"""
+    body = orjson.dumps(payload) if orjson else json.dumps(payload).encode()
+    return app.response_class(body, status=status, mimetype="application/json")
+
+
+# Flask app for webhook endpoint; the handler and its executor are built
+# once per process, by create_app or on the first request
 app = Flask(__name__)
-webhook_handler = AlertWebhookHandler()
+webhook_handler: Optional[AlertWebhookHandler] = None
+webhook_executor: Optional[ThreadPoolExecutor] = None
+_handler_pid: Optional[int] = None
+_handler_lock = threading.Lock()
+
+
+def _init_process() -> None:
+    """Set up logging, the webhook handler and its executor for this process"""
+    global webhook_handler, webhook_executor, _handler_pid
+    if _handler_pid == os.getpid():
+        return
+
+    with _handler_lock:
+        if _handler_pid == os.getpid():
+            return
+        setup_logging()
+        logger.info(f"Starting alert webhook handler (pid {os.getpid()})")
+        webhook_handler = AlertWebhookHandler()
+        webhook_executor = ThreadPoolExecutor(
+            max_workers=WEBHOOK_WORKERS, thread_name_prefix="webhook"
+        )
+        _handler_pid = os.getpid()
+
+
+def create_app() -> Flask:
+    """Set up this process and return the Flask app
+
+    This is the gunicorn entry point, so every worker sets up its own
+    logging, handler, GitHub session and thread pools after the fork.
+    """
+    _init_process()
+    return app
+
+
+# Serving `alert_webhook_handler:app` directly sets up on the first request
+app.before_request(_init_process)
 
 
 @app.route("/webhook/github", methods=["POST"])
 def github_webhook():
     """GitHub webhook endpoint"""
     try:
-        data = request.get_json()
-        result = webhook_handler.handle_webhook(data)
-        return jsonify(result)
+        # Verify the signature on the raw body before parsing any JSON
+        if WEBHOOK_SECRET and not _valid_signature(
+            request.get_data(), request.headers.get("X-Hub-Signature-256")
+        ):
+            logger.warning("Rejected webhook with missing or invalid signature")
+            return _json_response(
+                {"status": "error", "error": "Invalid signature"}, 401
+            )
+
+        data = _loads(request.get_data())
+        # Acknowledge right away so GitHub latency never hits Alertmanager's
+        # webhook timeout; the alerts are processed in the background
+        future = webhook_executor.submit(webhook_handler.handle_webhook, data)
+        future.add_done_callback(_log_webhook_result)
+        return _json_response({"status": "queued"}, 202)
 
     except Exception as e:
         logger.error(f"Webhook endpoint error: {e}")
-        return jsonify({"status": "error", "error": str(e)}), 500
+        return _json_response({"status": "error", "error": str(e)}, 500)
 
 
 @app.route("/webhook/test", methods=["POST"])
 def test_webhook():
     """Test webhook endpoint"""
     try:
-        data = request.get_json()
+        data = _loads(request.get_data())
         logger.info(f"Test webhook received: {data}")
-        return jsonify({"status": "success", "message": "Test webhook received"})
+        return _json_response({"status": "success", "message": "Test webhook received"})
 
     except Exception as e:
         logger.error(f"Test webhook error: {e}")
-        return jsonify({"status": "error", "error": str(e)}), 500
+        return _json_response({"status": "error", "error": str(e)}, 500)
 
 
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
-    return jsonify(
+    return _json_response(
         {
             "status": "healthy",
             "github_manager": webhook_handler.github_manager is not None,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
         }
     )
 
 
 if __name__ == "__main__":
-    # Load environment variables
-    import sys
-
-    sys.path.append("/home/yasar/cicd_project")
-
-    # Load .env file
-    env_file = Path("/home/yasar/cicd_project/.env")
-    if env_file.exists():
-        with open(env_file) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith("#") and "=" in line:
-                    key, value = line.split("=", 1)
-                    os.environ[key] = value
-
-    # Start Flask app
-    logger.info("Starting alert webhook handler...")
-    app.run(host="0.0.0.0", port=8080, debug=False)
+    # Replace this process with gunicorn; each worker imports the module and
+    # calls create_app, so nothing is built here before the fork
+    os.execv(
+        sys.executable,
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--workers",
+            "4",
+            "--worker-class",
+            "gthread",
+            "--threads",
+            "8",
+            "--bind",
+            "0.0.0.0:8080",
+            "--chdir",
+            str(Path(__file__).resolve().parent),
+            "--pythonpath",
+            "/home/yasar/cicd_project",
+            "alert_webhook_handler:create_app()",
+        ],
+    )
@@ -17,17 +17,105 @@ Date: 2024
 """
 
 import argparse
-import hashlib
+import io
 import json
 import logging
-import shutil
+import os
 import sqlite3
-import subprocess
 import sys
 import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
+
+import blake3
+import zstandard as zstd
+
+try:
+    import orjson
+except ImportError:
+    # Optional faster JSON encoder; the stdlib json module is used without it
+    orjson = None
+
+# Backups are tar archives compressed with multi-threaded zstd; archives from
+# before the switch are gzip-compressed and still listed, verified and restored
+ARCHIVE_SUFFIX = ".tar.zst"
+LEGACY_ARCHIVE_SUFFIX = ".tar.gz"
+# Per-archive manifests written before the append-only backup index
+MANIFEST_SUFFIX = "_manifest.json"
+
+# Bytes read per call when streaming a file into the archive, and the block
+# size of the tar streams to and from the compressor (tarfile's defaults are
+# 16 KiB and 10 KiB)
+COPY_BUFSIZE = 1 << 20
+
+# Archive members larger than this are extracted inline on restore rather
+# than buffered in memory for a writer thread
+RESTORE_INLINE_SIZE = 64 << 20
+
+# Bytes of the database sampled to detect data that barely compresses, and
+# the level-1 ratio below which the fastest zstd level is used instead
+ZSTD_SAMPLE_SIZE = 1 << 20
+ZSTD_MIN_SAMPLE_RATIO = 1.05
+
+
+def _dump_json(obj: Any, indent: bool = True) -> bytes:
+    """Serialize metadata as JSON, with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+def _fadvise(fd: int, advice: str) -> None:
+    """Give the kernel a posix_fadvise hint for a whole file, if supported"""
+    if hasattr(os, advice):
+        try:
+            os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+
+def _prefetch(path: Union[Path, os.DirEntry]) -> None:
+    """Ask the kernel to read a file into the page cache in the background"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        _fadvise(fd, "POSIX_FADV_WILLNEED")
+    finally:
+        os.close(fd)
+
+
+def _write_member(dest: Path, data: bytes, mode: int, mtime: float) -> None:
+    """Write an extracted archive member and restore its mode and mtime"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dest.write_bytes(data)
+    os.chmod(dest, mode)
+    os.utime(dest, (mtime, mtime))
+
+
+class _HashingWriter:
+    """File wrapper that hashes the bytes written through it"""
+
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+        self.hasher = blake3.blake3()
+
+    def write(self, data: bytes) -> int:
+        self.hasher.update(data)
+        return self.fileobj.write(data)
+
+    def flush(self) -> None:
+        self.fileobj.flush()
+
+    def close(self) -> None:
+        self.fileobj.close()
 
 
 class BackupManager:
@@ -36,6 +124,7 @@ class BackupManager:
     def __init__(self, project_root: str = "/home/cayir/cicd_project"):
         self.project_root = Path(project_root)
         self.backup_root = self.project_root / "backups"
+        self.index_path = self.backup_root / "backups.ndjson"
         self.config_path = self.project_root / "config"
         self.data_path = self.project_root / "data"
         self.log_path = Path("/var/log/reddit-sentiment-pipeline")
@@ -45,7 +134,15 @@ class BackupManager:
             "daily_retention_days": 7,
             "weekly_retention_weeks": 4,
             "monthly_retention_months": 12,
-            "compression_level": 6,
+            # zstd level per backup type: 1-5 realtime, 10-15 balanced,
+            # 19-22 archival
+            "zstd_level": 3,
+            "zstd_levels": {"daily": 3, "weekly": 10, "monthly": 19},
+            # Backup types that also get a SQL text dump of the database
+            "sql_dump_types": ["weekly", "monthly"],
+            # Backup types that run the full PRAGMA integrity_check instead
+            # of quick_check on the database
+            "deep_verify_types": ["monthly"],
             "verify_backups": True,
             "backup_database": True,
             "backup_config": True,
@@ -55,6 +152,10 @@ class BackupManager:
         # Setup logging
         self.setup_logging()
 
+        # Backup directory scan shared by list_backups and cleanup_old_backups
+        self._backup_index = None
+        self._backup_index_mtime = None
+
         # Ensure backup directory exists
         self.backup_root.mkdir(parents=True, exist_ok=True)
 
@@ -90,18 +191,148 @@ class BackupManager:
             self.logger.error(f"Error loading backup configuration: {e}")
 
     def calculate_checksum(self, file_path: Path) -> str:
-        """Calculate MD5 checksum for file verification"""
-        hash_md5 = hashlib.md5()
+        """Calculate BLAKE3 checksum for file verification"""
         try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            # Hash the memory-mapped file, using all cores for large files
+            hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+            hasher.update_mmap(file_path)
+            return hasher.hexdigest()
         except Exception as e:
             self.logger.error(f"Error calculating checksum for {file_path}: {e}")
             return ""
 
-    def backup_database(self, backup_dir: Path) -> bool:
+    def _archive_path(self, backup_name: str) -> Path:
+        """Path of a backup archive, falling back to a legacy gzip archive"""
+        archive_path = self.backup_root / f"{backup_name}{ARCHIVE_SUFFIX}"
+        legacy_path = self.backup_root / f"{backup_name}{LEGACY_ARCHIVE_SUFFIX}"
+        if not archive_path.exists() and legacy_path.exists():
+            return legacy_path
+        return archive_path
+
+    def _scan_backup_index(self) -> Dict[str, Dict[str, Optional[os.DirEntry]]]:
+        """Archives and manifests in the backup directory, keyed by backup name
+
+        Built with a single directory scan, and only rebuilt once the
+        directory has changed since the previous scan.
+        """
+        mtime_ns = os.stat(self.backup_root).st_mtime_ns
+        if self._backup_index is not None and self._backup_index_mtime == mtime_ns:
+            return self._backup_index
+
+        archives = {}
+        manifests = {}
+        with os.scandir(self.backup_root) as it:
+            for entry in it:
+                if entry.name.endswith(MANIFEST_SUFFIX):
+                    manifests[entry.name[: -len(MANIFEST_SUFFIX)]] = entry
+                elif entry.name.endswith((ARCHIVE_SUFFIX, LEGACY_ARCHIVE_SUFFIX)):
+                    archives[self._backup_name(entry)] = entry
+
+        self._backup_index = {
+            backup_name: {
+                "archive_entry": entry,
+                "manifest_entry": manifests.get(backup_name),
+            }
+            for backup_name, entry in archives.items()
+        }
+        self._backup_index_mtime = mtime_ns
+        return self._backup_index
+
+    @staticmethod
+    def _scan_files(directory: Path) -> List[os.DirEntry]:
+        """Regular files in a directory; their stat results are cached"""
+        with os.scandir(directory) as it:
+            return [entry for entry in it if entry.is_file()]
+
+    @staticmethod
+    def _backup_name(archive_path: Union[Path, os.DirEntry]) -> str:
+        """Backup name of an archive, without the archive suffix"""
+        for suffix in (ARCHIVE_SUFFIX, LEGACY_ARCHIVE_SUFFIX):
+            if archive_path.name.endswith(suffix):
+                return archive_path.name[: -len(suffix)]
+        return archive_path.stem
+
+    @contextmanager
+    def _read_archive(self, archive_path: Path) -> Iterator[tarfile.TarFile]:
+        """Open a backup archive for sequential reading"""
+        if archive_path.name.endswith(LEGACY_ARCHIVE_SUFFIX):
+            with tarfile.open(archive_path, "r|gz", bufsize=COPY_BUFSIZE) as tar:
+                yield tar
+            return
+
+        dctx = zstd.ZstdDecompressor()
+        with open(archive_path, "rb") as raw:
+            with (
+                dctx.stream_reader(raw) as zf,
+                tarfile.open(fileobj=zf, mode="r|", bufsize=COPY_BUFSIZE) as tar,
+            ):
+                yield tar
+
+                # Read past the end of the tar data to the end of the zstd
+                # frame, which is where its content checksum is verified
+                while zf.read(COPY_BUFSIZE):
+                    pass
+
+    def _add_component(
+        self,
+        tar: tarfile.TarFile,
+        component_dir: str,
+        files: List[Union[Path, os.DirEntry]],
+        metadata: Dict[str, Any],
+    ) -> None:
+        """Stream component files into the archive, followed by their metadata
+
+        Files are not hashed individually; the archive checksum in the
+        backup index covers their contents.
+        """
+        for index, src in enumerate(files):
+            # Have the kernel start reading the next file while this one is
+            # compressed
+            if index + 1 < len(files):
+                _prefetch(files[index + 1])
+
+            with open(src, "rb") as f:
+                _fadvise(f.fileno(), "POSIX_FADV_SEQUENTIAL")
+
+                # Build the header from the open file (fstat, no path lookup)
+                tarinfo = tar.gettarinfo(
+                    arcname=f"{component_dir}/{src.name}", fileobj=f
+                )
+                tar.addfile(tarinfo, f)
+
+                # The file won't be read again; let its pages be dropped
+                _fadvise(f.fileno(), "POSIX_FADV_DONTNEED")
+
+            metadata["files"][src.name] = {
+                "size": tarinfo.size,
+                "modified": datetime.fromtimestamp(tarinfo.mtime).isoformat(),
+            }
+
+        data = _dump_json(metadata)
+        tarinfo = tarfile.TarInfo(f"{component_dir}/metadata.json")
+        tarinfo.size = len(data)
+        tarinfo.mtime = int(time.time())
+        tar.addfile(tarinfo, io.BytesIO(data))
+
+    @staticmethod
+    def _write_sql_dump(conn: sqlite3.Connection, dump_path: Path) -> None:
+        """Write an SQL text dump of a database, in writes of about 1 MiB"""
+        with open(dump_path, "wb") as f:
+            chunk: List[bytes] = []
+            chunk_size = 0
+            for line in conn.iterdump():
+                data = f"{line}\n".encode()
+                chunk.append(data)
+                chunk_size += len(data)
+                if chunk_size >= COPY_BUFSIZE:
+                    f.write(b"".join(chunk))
+                    chunk.clear()
+                    chunk_size = 0
+            f.write(b"".join(chunk))
+
+    def backup_database(
+        self, tar: tarfile.TarFile, backup_name: str, backup_type: str = "daily"
+    ) -> bool:
         """Backup SQLite database with integrity check"""
         try:
             self.logger.info("Starting database backup...")
@@ -111,15 +342,18 @@ class BackupManager:
                 self.logger.warning("Database file not found, skipping database backup")
                 return True
 
-            # Create database backup directory
-            db_backup_dir = backup_dir / "database"
-            db_backup_dir.mkdir(parents=True, exist_ok=True)
+            # Check database integrity before backup; the full check, which
+            # also cross-checks every index against its table, only runs for
+            # deep-verified backup types
+            if backup_type in self.backup_config["deep_verify_types"]:
+                integrity_pragma = "PRAGMA integrity_check"
+            else:
+                integrity_pragma = "PRAGMA quick_check"
 
-            # Check database integrity before backup
             try:
                 with sqlite3.connect(str(db_path)) as conn:
                     cursor = conn.cursor()
-                    cursor.execute("PRAGMA integrity_check")
+                    cursor.execute(integrity_pragma)
                     integrity_result = cursor.fetchone()[0]
 
                     if integrity_result != "ok":
@@ -131,39 +365,42 @@ class BackupManager:
                 self.logger.error(f"Database integrity check error: {e}")
                 return False
 
-            # Create database backup
-            backup_db_path = db_backup_dir / "reddit_posts.db"
-            shutil.copy2(db_path, backup_db_path)
-
-            # Create database dump for additional safety
-            dump_path = db_backup_dir / "reddit_posts_dump.sql"
-            try:
-                with open(dump_path, "w") as f:
-                    subprocess.run(
-                        ["sqlite3", str(db_path), ".dump"], stdout=f, check=True
-                    )
-            except Exception as e:
-                self.logger.warning(f"Database dump creation failed: {e}")
-
-            # Calculate checksums
-            db_checksum = self.calculate_checksum(backup_db_path)
-
-            # Save backup metadata
             metadata = {
                 "type": "database",
                 "timestamp": datetime.now().isoformat(),
-                "files": {
-                    "reddit_posts.db": {
-                        "size": backup_db_path.stat().st_size,
-                        "checksum": db_checksum,
-                    }
-                },
+                "files": {},
                 "integrity_check": "passed",
             }
 
-            metadata_path = db_backup_dir / "metadata.json"
-            with open(metadata_path, "w") as f:
-                json.dump(metadata, f, indent=2)
+            with tempfile.TemporaryDirectory(dir=self.backup_root) as scratch_dir:
+                backup_db_path = Path(scratch_dir) / "reddit_posts.db"
+                files = [backup_db_path]
+
+                # Snapshot the database with the online backup API, which is
+                # consistent under concurrent writes; WAL mode keeps the
+                # collector's writes from blocking on the backup's reads
+                with (
+                    closing(sqlite3.connect(str(db_path))) as src,
+                    closing(sqlite3.connect(str(backup_db_path))) as dst,
+                ):
+                    src.execute("PRAGMA journal_mode=WAL")
+                    src.execute("PRAGMA wal_autocheckpoint=1000")
+                    src.execute("PRAGMA synchronous=NORMAL")
+                    src.backup(dst, pages=1024)
+
+                    # Create database dump for additional safety
+                    if backup_type in self.backup_config["sql_dump_types"]:
+                        dump_path = Path(scratch_dir) / "reddit_posts_dump.sql"
+                        try:
+                            self._write_sql_dump(dst, dump_path)
+                            files.append(dump_path)
+                        except Exception as e:
+                            self.logger.warning(f"Database dump creation failed: {e}")
+
+                    # Keep the WAL from growing without bound
+                    src.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+                self._add_component(tar, f"{backup_name}/database", files, metadata)
 
             self.logger.info("Database backup completed successfully")
             return True
@@ -172,7 +409,7 @@ class BackupManager:
             self.logger.error(f"Database backup failed: {e}")
             return False
 
-    def backup_configuration(self, backup_dir: Path) -> bool:
+    def backup_configuration(self, tar: tarfile.TarFile, backup_name: str) -> bool:
         """Backup configuration files"""
         try:
             self.logger.info("Starting configuration backup...")
@@ -183,15 +420,6 @@ class BackupManager:
                 )
                 return True
 
-            config_backup_dir = backup_dir / "config"
-            config_backup_dir.mkdir(parents=True, exist_ok=True)
-
-            # Copy all configuration files
-            for config_file in self.config_path.iterdir():
-                if config_file.is_file():
-                    dest_file = config_backup_dir / config_file.name
-                    shutil.copy2(config_file, dest_file)
-
             # Create metadata
             metadata = {
                 "type": "configuration",
@@ -199,16 +427,9 @@ class BackupManager:
                 "files": {},
             }
 
-            for config_file in config_backup_dir.iterdir():
-                if config_file.is_file() and config_file.name != "metadata.json":
-                    metadata["files"][config_file.name] = {
-                        "size": config_file.stat().st_size,
-                        "checksum": self.calculate_checksum(config_file),
-                    }
-
-            metadata_path = config_backup_dir / "metadata.json"
-            with open(metadata_path, "w") as f:
-                json.dump(metadata, f, indent=2)
+            # Archive all configuration files
+            files = self._scan_files(self.config_path)
+            self._add_component(tar, f"{backup_name}/config", files, metadata)
 
             self.logger.info("Configuration backup completed successfully")
             return True
@@ -217,7 +438,7 @@ class BackupManager:
             self.logger.error(f"Configuration backup failed: {e}")
             return False
 
-    def backup_logs(self, backup_dir: Path) -> bool:
+    def backup_logs(self, tar: tarfile.TarFile, backup_name: str) -> bool:
         """Backup recent log files"""
         try:
             self.logger.info("Starting logs backup...")
@@ -226,9 +447,6 @@ class BackupManager:
                 self.logger.warning("Log directory not found, skipping logs backup")
                 return True
 
-            logs_backup_dir = backup_dir / "logs"
-            logs_backup_dir.mkdir(parents=True, exist_ok=True)
-
             # Backup recent log files (last 7 days)
             cutoff_date = datetime.now() - timedelta(days=7)
 
@@ -238,23 +456,13 @@ class BackupManager:
                 "files": {},
             }
 
-            for log_file in self.log_path.iterdir():
-                if log_file.is_file():
-                    file_mtime = datetime.fromtimestamp(log_file.stat().st_mtime)
+            files = [
+                entry
+                for entry in self._scan_files(self.log_path)
+                if datetime.fromtimestamp(entry.stat().st_mtime) > cutoff_date
+            ]
 
-                    if file_mtime > cutoff_date:
-                        dest_file = logs_backup_dir / log_file.name
-                        shutil.copy2(log_file, dest_file)
-
-                        metadata["files"][log_file.name] = {
-                            "size": dest_file.stat().st_size,
-                            "checksum": self.calculate_checksum(dest_file),
-                            "modified": file_mtime.isoformat(),
-                        }
-
-            metadata_path = logs_backup_dir / "metadata.json"
-            with open(metadata_path, "w") as f:
-                json.dump(metadata, f, indent=2)
+            self._add_component(tar, f"{backup_name}/logs", files, metadata)
 
             self.logger.info("Logs backup completed successfully")
             return True
@@ -263,18 +471,40 @@ class BackupManager:
             self.logger.error(f"Logs backup failed: {e}")
             return False
 
+    def select_zstd_level(self, backup_type: str) -> int:
+        """Pick the zstd level for a backup type, adapted to the data"""
+        level = self.backup_config["zstd_levels"].get(
+            backup_type, self.backup_config["zstd_level"]
+        )
+
+        # The database dominates the archive; if a sample of it barely
+        # compresses, higher levels would only cost time
+        try:
+            with open(self.data_path / "reddit_posts.db", "rb") as f:
+                sample = f.read(ZSTD_SAMPLE_SIZE)
+        except OSError:
+            return level
+
+        if sample:
+            compressed = zstd.ZstdCompressor(level=1).compress(sample)
+            ratio = len(sample) / len(compressed)
+            if ratio < ZSTD_MIN_SAMPLE_RATIO and level > 1:
+                self.logger.info(
+                    f"Database sample compresses {ratio:.2f}x, using zstd level 1"
+                )
+                return 1
+
+        return level
+
     def create_backup(self, backup_type: str = "daily") -> bool:
         """Create a complete backup"""
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_name = f"{backup_type}_{timestamp}"
-            backup_dir = self.backup_root / backup_name
+            archive_path = self.backup_root / f"{backup_name}{ARCHIVE_SUFFIX}"
 
             self.logger.info(f"Starting {backup_type} backup: {backup_name}")
 
-            # Create backup directory
-            backup_dir.mkdir(parents=True, exist_ok=True)
-
             # Track backup results
             backup_results = {
                 "type": backup_type,
@@ -283,55 +513,64 @@ class BackupManager:
                 "components": {},
             }
 
-            # Backup components
-            if self.backup_config["backup_database"]:
-                backup_results["components"]["database"] = self.backup_database(
-                    backup_dir
-                )
+            # Stream the components straight into the compressed archive
+            self.logger.info(f"Creating compressed archive: {archive_path}")
+
+            level = self.select_zstd_level(backup_type)
+            zctx = zstd.ZstdCompressor(level=level, threads=-1, write_checksum=True)
+            with open(archive_path, "wb") as raw:
+                # Hash the compressed bytes on their way to disk, so the
+                # archive doesn't have to be read back for its checksum
+                archive_writer = _HashingWriter(raw)
+                with (
+                    zctx.stream_writer(archive_writer) as zf,
+                    tarfile.open(
+                        fileobj=zf,
+                        mode="w|",
+                        bufsize=COPY_BUFSIZE,
+                        dereference=True,
+                        copybufsize=COPY_BUFSIZE,
+                    ) as tar,
+                ):
+                    # Backup components
+                    if self.backup_config["backup_database"]:
+                        backup_results["components"]["database"] = self.backup_database(
+                            tar, backup_name, backup_type
+                        )
 
-            if self.backup_config["backup_config"]:
-                backup_results["components"]["configuration"] = (
-                    self.backup_configuration(backup_dir)
-                )
+                    if self.backup_config["backup_config"]:
+                        backup_results["components"]["configuration"] = (
+                            self.backup_configuration(tar, backup_name)
+                        )
 
-            if self.backup_config["backup_logs"]:
-                backup_results["components"]["logs"] = self.backup_logs(backup_dir)
+                    if self.backup_config["backup_logs"]:
+                        backup_results["components"]["logs"] = self.backup_logs(
+                            tar, backup_name
+                        )
 
             # Check if all components succeeded
             all_success = all(backup_results["components"].values())
             backup_results["status"] = "completed" if all_success else "partial_failure"
 
-            # Create compressed archive
             if all_success:
-                archive_path = self.backup_root / f"{backup_name}.tar.gz"
-
-                self.logger.info(f"Creating compressed archive: {archive_path}")
-
-                with tarfile.open(
-                    archive_path,
-                    "w:gz",
-                    compresslevel=self.backup_config["compression_level"],
-                ) as tar:
-                    tar.add(backup_dir, arcname=backup_name)
-
-                # Remove uncompressed backup directory
-                shutil.rmtree(backup_dir)
+                archive_checksum = archive_writer.hasher.hexdigest()
 
                 # Update backup results with archive info
                 backup_results["archive"] = {
                     "path": str(archive_path),
                     "size": archive_path.stat().st_size,
-                    "checksum": self.calculate_checksum(archive_path),
+                    "blake3": archive_checksum,
                 }
 
                 # Verify backup if configured
                 if self.backup_config["verify_backups"]:
                     backup_results["verification"] = self.verify_backup(archive_path)
+            else:
+                # Don't keep an archive that is missing components
+                archive_path.unlink()
 
-            # Save backup manifest
-            manifest_path = self.backup_root / f"{backup_name}_manifest.json"
-            with open(manifest_path, "w") as f:
-                json.dump(backup_results, f, indent=2)
+            # Record the backup in the append-only index
+            self._append_backup_record({"name": backup_name, **backup_results})
 
             if all_success:
                 self.logger.info(f"Backup {backup_name} completed successfully")
@@ -344,6 +583,55 @@ class BackupManager:
             self.logger.error(f"Backup creation failed: {e}")
             return False
 
+    def _append_backup_record(self, record: Dict[str, Any]) -> None:
+        """Append one backup's results to the index as a JSON line"""
+        line = _dump_json(record, indent=False) + b"\n"
+        with open(self.index_path, "a+b") as f:
+            # Start on a fresh line if a previous append was cut short
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+
+    def _load_backup_records(self) -> Dict[str, Dict[str, Any]]:
+        """Latest index record of every backup, keyed by backup name"""
+        records = {}
+        try:
+            with open(self.index_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # e.g. a line cut short by a crash mid-append
+                        self.logger.warning("Skipping malformed backup index line")
+                        continue
+                    records[record["name"]] = record
+        except FileNotFoundError:
+            pass
+        return records
+
+    def _load_manifest(self, manifest_path: str) -> Optional[Dict[str, Any]]:
+        """Load a legacy per-archive manifest"""
+        try:
+            with open(manifest_path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Could not load manifest {manifest_path}: {e}")
+            return None
+
+    def _recorded_checksum(self, archive_path: Path) -> Optional[str]:
+        """Archive checksum recorded when the backup was created, if any"""
+        backup_name = self._backup_name(archive_path)
+        record = self._load_backup_records().get(backup_name)
+        if record is None:
+            manifest_path = archive_path.parent / f"{backup_name}{MANIFEST_SUFFIX}"
+            if manifest_path.exists():
+                record = self._load_manifest(str(manifest_path))
+        if record is None:
+            return None
+        return record.get("archive", {}).get("blake3")
+
     def verify_backup(self, archive_path: Path) -> Dict:
         """Verify backup integrity"""
         try:
@@ -363,25 +651,45 @@ class BackupManager:
 
             verification_result["checks"]["file_exists"] = True
 
+            # An archive whose bytes still hash to the checksum recorded in
+            # its manifest is intact; only walk it when that can't be confirmed
+            manifest_checksum = self._recorded_checksum(archive_path)
+            if manifest_checksum:
+                checksum_matches = (
+                    self.calculate_checksum(archive_path) == manifest_checksum
+                )
+                verification_result["checks"]["manifest_checksum"] = checksum_matches
+                if checksum_matches:
+                    verification_result["status"] = "passed"
+                    return verification_result
+
             # Test archive integrity
             try:
-                with tarfile.open(archive_path, "r:gz") as tar:
-                    # List contents without extracting
-                    members = tar.getmembers()
+                with self._read_archive(archive_path) as tar:
+                    # Count the members as they stream past, without
+                    # extracting or keeping them
+                    file_count = sum(1 for _ in tar)
                     verification_result["checks"]["archive_integrity"] = True
-                    verification_result["checks"]["file_count"] = len(members)
+                    verification_result["checks"]["file_count"] = file_count
             except Exception as e:
                 verification_result["checks"]["archive_integrity"] = False
                 verification_result["checks"]["error"] = str(e)
                 verification_result["status"] = "failed"
                 return verification_result
 
-            # Check file size is reasonable (not empty, not too small)
             file_size = archive_path.stat().st_size
             verification_result["checks"]["file_size"] = file_size
-            verification_result["checks"]["size_check"] = (
-                file_size > 1024
-            )  # At least 1KB
+
+            if archive_path.name.endswith(ARCHIVE_SUFFIX):
+                # The frame carries a content checksum, verified while reading
+                with open(archive_path, "rb") as f:
+                    frame = zstd.get_frame_parameters(f.read(18))
+                verification_result["checks"]["frame_checksum"] = frame.has_checksum
+            else:
+                # Check file size is reasonable (not empty, not too small)
+                verification_result["checks"]["size_check"] = (
+                    file_size > 1024
+                )  # At least 1KB
 
             # Overall verification status
             all_checks_passed = all(
@@ -402,6 +710,43 @@ class BackupManager:
                 "timestamp": datetime.now().isoformat(),
             }
 
+    def _extract_archive(self, archive_path: Path, restore_path: Path) -> None:
+        """Extract an archive, writing regular files from a thread pool
+
+        The archive is decompressed sequentially on this thread; small
+        members are read into memory and written out in parallel, with at
+        most two per worker in flight. Large members are extracted inline.
+        """
+        restore_root = restore_path.resolve()
+        workers = os.cpu_count() or 1
+        in_flight = threading.BoundedSemaphore(2 * workers)
+        futures = []
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            with self._read_archive(archive_path) as tar:
+                for member in tar:
+                    dest = (restore_root / member.name).resolve()
+                    if restore_root not in dest.parents:
+                        raise ValueError(
+                            f"Archive member outside restore path: {member.name}"
+                        )
+
+                    if not member.isfile() or member.size > RESTORE_INLINE_SIZE:
+                        tar.extract(member, path=restore_root)
+                        continue
+
+                    data = tar.extractfile(member).read()
+                    in_flight.acquire()
+                    future = executor.submit(
+                        _write_member, dest, data, member.mode, member.mtime
+                    )
+                    future.add_done_callback(lambda _: in_flight.release())
+                    futures.append(future)
+
+            # Surface the first write error, if any
+            for future in futures:
+                future.result()
+
     def restore_backup(
         self, backup_name: str, restore_path: Optional[Path] = None
     ) -> bool:
@@ -413,7 +758,7 @@ class BackupManager:
             self.logger.info(f"Starting restore from backup: {backup_name}")
 
             # Find backup archive
-            archive_path = self.backup_root / f"{backup_name}.tar.gz"
+            archive_path = self._archive_path(backup_name)
 
             if not archive_path.exists():
                 self.logger.error(f"Backup archive not found: {archive_path}")
@@ -431,8 +776,7 @@ class BackupManager:
             # Extract backup
             self.logger.info(f"Extracting backup to: {restore_path}")
 
-            with tarfile.open(archive_path, "r:gz") as tar:
-                tar.extractall(path=restore_path)
+            self._extract_archive(archive_path, restore_path)
 
             self.logger.info("Backup restore completed successfully")
             return True
@@ -448,32 +792,46 @@ class BackupManager:
 
             now = datetime.now()
             deleted_count = 0
+            deleted_names = set()
+
+            # Backup names carry a sortable YYYYMMDD_HHMMSS stamp, so the
+            # retention policy compares them against one cutoff stamp per
+            # type; a backup is expired once its age in whole days exceeds
+            # the retention period
+            retention_days = {
+                "daily": self.backup_config["daily_retention_days"],
+                "weekly": self.backup_config["weekly_retention_weeks"] * 7,
+                "monthly": self.backup_config["monthly_retention_months"] * 30,
+            }
+            cutoffs = {
+                backup_type: (now - timedelta(days=days + 1)).strftime("%Y%m%d_%H%M%S")
+                for backup_type, days in retention_days.items()
+            }
 
             # Get all backup files
             backup_files = []
-            for file_path in self.backup_root.glob("*.tar.gz"):
-                try:
-                    # Parse timestamp from filename
-                    parts = file_path.stem.split("_")
-                    if len(parts) >= 3:
-                        backup_type = parts[0]
-                        date_str = parts[1]
-                        time_str = parts[2]
-
-                        timestamp = datetime.strptime(
-                            f"{date_str}_{time_str}", "%Y%m%d_%H%M%S"
-                        )
-
-                        backup_files.append(
-                            {
-                                "path": file_path,
-                                "type": backup_type,
-                                "timestamp": timestamp,
-                            }
-                        )
-                except Exception as e:
+            for backup_name, entries in self._scan_backup_index().items():
+                # Parse timestamp from filename
+                parts = backup_name.split("_")
+                if (
+                    len(parts) >= 3
+                    and len(parts[1]) == 8
+                    and len(parts[2]) == 6
+                    and parts[1].isdigit()
+                    and parts[2].isdigit()
+                ):
+                    backup_files.append(
+                        {
+                            **entries,
+                            "name": backup_name,
+                            "type": parts[0],
+                            "timestamp": f"{parts[1]}_{parts[2]}",
+                        }
+                    )
+                else:
                     self.logger.warning(
-                        f"Could not parse backup filename: {file_path}: {e}"
+                        f"Could not parse backup filename: "
+                        f"{entries['archive_entry'].path}"
                     )
 
             # Sort by timestamp (newest first)
@@ -481,42 +839,43 @@ class BackupManager:
 
             # Apply retention policy
             for backup in backup_files:
-                should_delete = False
-                age = now - backup["timestamp"]
-
-                if backup["type"] == "daily":
-                    should_delete = (
-                        age.days > self.backup_config["daily_retention_days"]
-                    )
-                elif backup["type"] == "weekly":
-                    should_delete = age.days > (
-                        self.backup_config["weekly_retention_weeks"] * 7
-                    )
-                elif backup["type"] == "monthly":
-                    should_delete = age.days > (
-                        self.backup_config["monthly_retention_months"] * 30
-                    )
+                cutoff = cutoffs.get(backup["type"])
+                should_delete = cutoff is not None and backup["timestamp"] <= cutoff
 
                 if should_delete:
+                    archive_entry = backup["archive_entry"]
                     try:
-                        backup["path"].unlink()
+                        os.unlink(archive_entry.path)
 
                         # Also delete manifest file
-                        manifest_path = (
-                            backup["path"].parent
-                            / f"{backup['path'].stem}_manifest.json"
-                        )
-                        if manifest_path.exists():
-                            manifest_path.unlink()
+                        if backup["manifest_entry"] is not None:
+                            os.unlink(backup["manifest_entry"].path)
 
+                        deleted_names.add(backup["name"])
                         deleted_count += 1
-                        self.logger.info(f"Deleted old backup: {backup['path'].name}")
+                        self.logger.info(f"Deleted old backup: {archive_entry.name}")
 
                     except Exception as e:
                         self.logger.error(
-                            f"Error deleting backup {backup['path']}: {e}"
+                            f"Error deleting backup {archive_entry.path}: {e}"
                         )
 
+            # Checkpoint the index, keeping only backups that still exist
+            if self.index_path.exists():
+                existing = self._scan_backup_index()
+                records = [
+                    record
+                    for name, record in self._load_backup_records().items()
+                    if name in existing and name not in deleted_names
+                ]
+                tmp_path = self.index_path.with_name(f"{self.index_path.name}.tmp")
+                tmp_path.write_bytes(
+                    b"".join(
+                        _dump_json(record, indent=False) + b"\n" for record in records
+                    )
+                )
+                os.replace(tmp_path, self.index_path)
+
             self.logger.info(
                 f"Backup cleanup completed. Deleted {deleted_count} old backups."
             )
@@ -531,28 +890,28 @@ class BackupManager:
         backups = []
 
         try:
-            for archive_path in self.backup_root.glob("*.tar.gz"):
-                manifest_path = self.backup_root / f"{archive_path.stem}_manifest.json"
+            records = self._load_backup_records()
+            for backup_name, entries in self._scan_backup_index().items():
+                archive_path = entries["archive_entry"].path
+                manifest_entry = entries["manifest_entry"]
+                archive_stat = entries["archive_entry"].stat()
 
                 backup_info = {
-                    "name": archive_path.stem,
-                    "path": str(archive_path),
-                    "size": archive_path.stat().st_size,
+                    "name": backup_name,
+                    "path": archive_path,
+                    "size": archive_stat.st_size,
                     "created": datetime.fromtimestamp(
-                        archive_path.stat().st_ctime
+                        archive_stat.st_ctime
                     ).isoformat(),
                 }
 
-                # Load manifest if available
-                if manifest_path.exists():
-                    try:
-                        with open(manifest_path, "r") as f:
-                            manifest = json.load(f)
-                            backup_info.update(manifest)
-                    except Exception as e:
-                        self.logger.warning(
-                            f"Could not load manifest for {archive_path}: {e}"
-                        )
+                # Add the recorded results, from a legacy manifest for
+                # backups made before the index
+                record = records.get(backup_name)
+                if record is None and manifest_entry is not None:
+                    record = self._load_manifest(manifest_entry.path)
+                if record is not None:
+                    backup_info.update(record)
 
                 backups.append(backup_info)
 
@@ -608,7 +967,7 @@ def main():
     elif args.restore:
         success = backup_manager.restore_backup(args.restore)
     elif args.verify:
-        archive_path = backup_manager.backup_root / f"{args.verify}.tar.gz"
+        archive_path = backup_manager._archive_path(args.verify)
         result = backup_manager.verify_backup(archive_path)
         print(f"Verification result: {result['status']}")
         if result["status"] != "passed":
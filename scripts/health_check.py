@@ -18,18 +18,34 @@ Date: 2024
 """
 
 import argparse
+import copy
 import json
 import logging
 import sqlite3
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures import as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Tuple
 
 import psutil
 import requests
+from requests.adapters import HTTPAdapter
+
+# Upper bound on a whole health check cycle; checks still pending are failed
+CHECK_TIMEOUT_SECONDS = 30
+
+# Calls to perform_health_check within this window reuse the last result
+CACHE_TTL_SECONDS = 2.0
+
+# How much of the end of application.log is scanned for recent errors
+LOG_TAIL_BYTES = 256 * 1024
+LOG_TAIL_LINES = 1000
 
 
 class HealthCheckMonitor:
@@ -67,6 +83,28 @@ class HealthCheckMonitor:
             "uptime": None,
         }
 
+        # Last health check result, shared by callers within CACHE_TTL_SECONDS
+        self._check_lock = threading.Lock()
+        self._cache_result = None
+        self._cache_ts = 0.0
+
+        # Checks that timed out and are still running, so they aren't started
+        # again on top of themselves
+        self._running_checks: Dict[str, Future] = {}
+
+        # Read-only database connection reused across checks
+        self._db_conn = None
+
+        # Keep-alive connections to the local API endpoints
+        self.session = requests.Session()
+        self.session.mount(
+            "http://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0)
+        )
+        # Threads for the endpoint requests, kept instead of recreated every cycle
+        self._api_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="health-api"
+        )
+
         # Load configuration
         self.load_configuration()
 
@@ -101,36 +139,31 @@ class HealthCheckMonitor:
     def check_service_status(self) -> Tuple[bool, str]:
         """Check systemd service status"""
         try:
+            # One `systemctl show` returns both the state and the uptime
             result = subprocess.run(
-                ["systemctl", "is-active", f"{self.service_name}.service"],
+                [
+                    "systemctl",
+                    "show",
+                    f"{self.service_name}.service",
+                    "--property=ActiveState,ActiveEnterTimestamp",
+                ],
                 capture_output=True,
                 text=True,
                 timeout=10,
             )
 
-            status = result.stdout.strip()
-            is_healthy = status == "active"
-
-            if is_healthy:
-                # Get service uptime
-                uptime_result = subprocess.run(
-                    [
-                        "systemctl",
-                        "show",
-                        f"{self.service_name}.service",
-                        "--property=ActiveEnterTimestamp",
-                    ],
-                    capture_output=True,
-                    text=True,
-                    timeout=10,
-                )
+            if result.returncode != 0:
+                return False, f"Service check failed: {result.stderr.strip()}"
+
+            properties = dict(
+                line.split("=", 1) for line in result.stdout.splitlines() if "=" in line
+            )
+            status = properties.get("ActiveState", "")
 
-                if uptime_result.returncode == 0:
-                    timestamp_line = uptime_result.stdout.strip()
-                    if "=" in timestamp_line:
-                        timestamp_str = timestamp_line.split("=", 1)[1]
-                        if timestamp_str and timestamp_str != "n/a":
-                            self.health_status["uptime"] = timestamp_str
+            if status == "active":
+                timestamp_str = properties.get("ActiveEnterTimestamp")
+                if timestamp_str and timestamp_str != "n/a":
+                    self.health_status["uptime"] = timestamp_str
 
                 return True, "Service is active"
             else:
@@ -179,42 +212,90 @@ class HealthCheckMonitor:
         except Exception as e:
             return False, f"Resource check error: {e}"
 
+    def _get_db_connection(self, db_path: Path) -> sqlite3.Connection:
+        """Return the shared read-only database connection, opening it if needed"""
+        if self._db_conn is None:
+            # Checks run on worker threads, never more than one at a time
+            conn = sqlite3.connect(
+                f"{db_path.as_uri()}?mode=ro",
+                uri=True,
+                timeout=5,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA query_only=ON")
+            self._db_conn = conn
+        return self._db_conn
+
+    def _close_db_connection(self):
+        """Drop the shared database connection so the next check reopens it"""
+        if self._db_conn is not None:
+            try:
+                self._db_conn.close()
+            except sqlite3.Error:
+                pass
+            self._db_conn = None
+
     def check_database_connectivity(self) -> Tuple[bool, str]:
         """Check database connectivity and integrity"""
         try:
             db_path = self.project_root / "data" / "reddit_posts.db"
 
             if not db_path.exists():
+                self._close_db_connection()
                 return False, "Database file does not exist"
 
             # Test database connection
-            with sqlite3.connect(str(db_path), timeout=5) as conn:
-                cursor = conn.cursor()
-
-                # Check if main table exists
-                cursor.execute("""
-                    SELECT name FROM sqlite_master 
-                    WHERE type='table' AND name='reddit_posts'
-                """)
-
-                if not cursor.fetchone():
-                    return False, "Main table 'reddit_posts' not found"
-
-                # Check recent data
-                cursor.execute("""
-                    SELECT COUNT(*) FROM reddit_posts 
+            cursor = self._get_db_connection(db_path).cursor()
+
+            # Check if main table exists
+            cursor.execute("""
+                SELECT name FROM sqlite_master 
+                WHERE type='table' AND name='reddit_posts'
+            """)
+
+            if not cursor.fetchone():
+                return False, "Main table 'reddit_posts' not found"
+
+            # Check recent data; stops at the first matching row instead of
+            # counting the whole day
+            cursor.execute("""
+                SELECT EXISTS(
+                    SELECT 1 FROM reddit_posts
                     WHERE created_at > datetime('now', '-1 day')
-                """)
+                )
+            """)
 
-                recent_count = cursor.fetchone()[0]
+            has_recent = bool(cursor.fetchone()[0])
 
-                return True, f"Database OK ({recent_count} posts in last 24h)"
+            return (
+                True,
+                f"Database OK (posts in last 24h: {'yes' if has_recent else 'no'})",
+            )
 
         except sqlite3.Error as e:
+            # The file may have been replaced or locked; start afresh next time
+            self._close_db_connection()
             return False, f"Database error: {e}"
         except Exception as e:
             return False, f"Database check error: {e}"
 
+    def _check_endpoint(self, url: str, name: str) -> Tuple[bool, str]:
+        """Check a single API endpoint"""
+        try:
+            start_time = time.time()
+            response = self.session.get(url, timeout=10)
+            response_time = (time.time() - start_time) * 1000
+
+            if response.status_code == 200:
+                if response_time > self.health_config["max_response_time_ms"]:
+                    return False, f"{name}: Slow response ({response_time:.0f}ms)"
+                return True, f"{name}: OK ({response_time:.0f}ms)"
+            else:
+                return False, f"{name}: HTTP {response.status_code}"
+
+        except requests.RequestException as e:
+            return False, f"{name}: Connection failed - {e}"
+
     def check_api_endpoints(self) -> Tuple[bool, str]:
         """Check API endpoints (metrics, health)"""
         try:
@@ -223,32 +304,15 @@ class HealthCheckMonitor:
                 ("http://localhost:8000/health", "Health endpoint"),
             ]
 
-            results = []
-            all_healthy = True
-
-            for url, name in endpoints:
-                try:
-                    start_time = time.time()
-                    response = requests.get(url, timeout=10)
-                    response_time = (time.time() - start_time) * 1000
-
-                    if response.status_code == 200:
-                        if response_time > self.health_config["max_response_time_ms"]:
-                            results.append(
-                                f"{name}: Slow response ({response_time:.0f}ms)"
-                            )
-                            all_healthy = False
-                        else:
-                            results.append(f"{name}: OK ({response_time:.0f}ms)")
-                    else:
-                        results.append(f"{name}: HTTP {response.status_code}")
-                        all_healthy = False
-
-                except requests.RequestException as e:
-                    results.append(f"{name}: Connection failed - {e}")
-                    all_healthy = False
+            # Query the endpoints in parallel over the shared session
+            checks = list(
+                self._api_executor.map(
+                    lambda endpoint: self._check_endpoint(*endpoint), endpoints
+                )
+            )
 
-            return all_healthy, "; ".join(results)
+            all_healthy = all(is_healthy for is_healthy, _ in checks)
+            return all_healthy, "; ".join(message for _, message in checks)
 
         except Exception as e:
             return False, f"API check error: {e}"
@@ -268,14 +332,20 @@ class HealthCheckMonitor:
 
             # Check for recent errors
             try:
-                with open(log_file, "r") as f:
-                    # Read last 1000 lines
-                    lines = f.readlines()[-1000:]
+                # Only read the end of the file, however large the log has grown
+                size = log_file.stat().st_size
+                with open(log_file, "rb") as f:
+                    f.seek(max(0, size - LOG_TAIL_BYTES))
+                    tail = f.read()
 
-                error_count = 0
-                for line in lines:
-                    if "ERROR" in line.upper():
-                        error_count += 1
+                lines = tail.splitlines()
+                if size > LOG_TAIL_BYTES:
+                    # The first line is most likely cut off by the seek
+                    lines = lines[1:]
+                window = b"\n".join(lines[-LOG_TAIL_LINES:])
+
+                # One case-folding pass and count over the window, not per line
+                error_count = window.upper().count(b"ERROR")
 
                 if error_count > 10:  # More than 10 errors in recent logs
                     return False, f"High error count in logs: {error_count} errors"
@@ -288,8 +358,24 @@ class HealthCheckMonitor:
         except Exception as e:
             return False, f"Log check error: {e}"
 
-    def perform_health_check(self) -> Dict:
-        """Perform comprehensive health check"""
+    def perform_health_check(self, force: bool = False) -> Dict:
+        """Perform comprehensive health check, reusing a result that is still fresh"""
+        # Only one thread runs the probes; concurrent callers get its result
+        with self._check_lock:
+            if (
+                not force
+                and self._cache_result is not None
+                and time.monotonic() - self._cache_ts < CACHE_TTL_SECONDS
+            ):
+                return copy.deepcopy(self._cache_result)
+
+            health_status = self._run_health_checks()
+            self._cache_result = copy.deepcopy(health_status)
+            self._cache_ts = time.monotonic()
+            return health_status
+
+    def _run_health_checks(self) -> Dict:
+        """Run all health checks and update the health status"""
         self.logger.info("Starting health check...")
 
         checks = [
@@ -301,33 +387,71 @@ class HealthCheckMonitor:
         ]
 
         results = {}
-        all_healthy = True
 
-        for check_name, check_func in checks:
-            try:
-                is_healthy, message = check_func()
-                results[check_name] = {
-                    "healthy": is_healthy,
-                    "message": message,
-                    "timestamp": datetime.now().isoformat(),
-                }
-
-                if not is_healthy:
-                    all_healthy = False
-                    self.logger.warning(
-                        f"Health check failed for {check_name}: {message}"
-                    )
-                else:
-                    self.logger.info(f"Health check passed for {check_name}: {message}")
+        # A check abandoned by an earlier cycle may still be running; starting
+        # it again would run two copies at once on shared state like _db_conn
+        for check_name, future in list(self._running_checks.items()):
+            if future.done():
+                del self._running_checks[check_name]
+        for check_name in self._running_checks:
+            results[check_name] = {
+                "healthy": False,
+                "message": "Check still running after timing out in an earlier cycle",
+                "timestamp": datetime.now().isoformat(),
+            }
+            self.logger.error(f"Health check still timed out for {check_name}")
+        runnable = [check for check in checks if check[0] not in self._running_checks]
 
-            except Exception as e:
-                results[check_name] = {
-                    "healthy": False,
-                    "message": f"Check error: {e}",
-                    "timestamp": datetime.now().isoformat(),
-                }
-                all_healthy = False
-                self.logger.error(f"Health check error for {check_name}: {e}")
+        # The checks are I/O bound (subprocess, sqlite, HTTP), so run them in
+        # parallel and let the cycle take as long as the slowest one
+        executor = ThreadPoolExecutor(max_workers=max(len(runnable), 1))
+        futures = {executor.submit(check_func): name for name, check_func in runnable}
+        try:
+            for future in as_completed(futures, timeout=CHECK_TIMEOUT_SECONDS):
+                check_name = futures[future]
+                try:
+                    is_healthy, message = future.result()
+                    results[check_name] = {
+                        "healthy": is_healthy,
+                        "message": message,
+                        "timestamp": datetime.now().isoformat(),
+                    }
+
+                    if not is_healthy:
+                        self.logger.warning(
+                            f"Health check failed for {check_name}: {message}"
+                        )
+                    else:
+                        self.logger.info(
+                            f"Health check passed for {check_name}: {message}"
+                        )
+
+                except Exception as e:
+                    results[check_name] = {
+                        "healthy": False,
+                        "message": f"Check error: {e}",
+                        "timestamp": datetime.now().isoformat(),
+                    }
+                    self.logger.error(f"Health check error for {check_name}: {e}")
+
+        except FuturesTimeoutError:
+            for future, check_name in futures.items():
+                if check_name not in results:
+                    if not future.cancel():
+                        self._running_checks[check_name] = future
+                    results[check_name] = {
+                        "healthy": False,
+                        "message": f"Check timed out after {CHECK_TIMEOUT_SECONDS}s",
+                        "timestamp": datetime.now().isoformat(),
+                    }
+                    self.logger.error(f"Health check timed out for {check_name}")
+        finally:
+            # Don't block on a hung check; its worker is abandoned
+            executor.shutdown(wait=False)
+
+        # Report in the declared order rather than completion order
+        results = {name: results[name] for name, _ in checks}
+        all_healthy = all(result["healthy"] for result in results.values())
 
         # Update overall health status
         self.health_status.update(
@@ -371,8 +495,8 @@ class HealthCheckMonitor:
                     # Wait a bit for service to start
                     time.sleep(10)
 
-                    # Re-check health
-                    self.perform_health_check()
+                    # Re-check health, bypassing the pre-restart cached result
+                    self.perform_health_check(force=True)
                 else:
                     self.logger.error(f"Service restart failed: {result.stderr}")
 
@@ -3,11 +3,12 @@
 import os
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 import pandas as pd
 import pytest
 
-from apps.collector.collector import RedditSentimentCollector
+from apps.collector.collector import CollectorManager, RedditSentimentCollector
 
 
 class TestRedditSentimentCollector:
@@ -124,6 +125,72 @@ class TestRedditSentimentCollector:
             del os.environ["OUTPUT_PATH"]
             del os.environ["DEDUP_DB_PATH"]
 
+    def test_save_streaming_matches_dataframe_output(self):
+        """Test that streamed CSV output matches the DataFrame path."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = Path(temp_dir) / "test_output.csv"
+            dedup_path = Path(temp_dir) / "dupes.db"
+
+            os.environ["OUTPUT_PATH"] = str(output_path)
+            os.environ["DEDUP_DB_PATH"] = str(dedup_path)
+            os.environ["ENABLE_SENTIMENT"] = "false"
+            collector = RedditSentimentCollector()
+            posts = collector._get_dummy_posts()
+
+            collector.save_to_csv(collector.posts_to_dataframe(posts))
+            dataframe_csv = output_path.read_text()
+
+            records = collector.save_streaming(posts, collector._iter_sentiment(posts))
+
+            assert records == len(posts)
+            assert output_path.read_text() == dataframe_csv
+
+            # Clean up
+            del os.environ["OUTPUT_PATH"]
+            del os.environ["DEDUP_DB_PATH"]
+            del os.environ["ENABLE_SENTIMENT"]
+
+    def test_combine_texts(self):
+        """Test combining titles and contents into sentiment input text."""
+        texts = RedditSentimentCollector._combine_texts(
+            ["Title", "Title", None, "Title "],
+            ["Body", "", "Body", None],
+        )
+
+        assert texts == ["Title. Body", "Title", ". Body", "Title "]
+
+    def test_csv_output_trimming(self):
+        """Test that the CSV trimming options apply to both write paths."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = Path(temp_dir) / "test_output.csv"
+            dedup_path = Path(temp_dir) / "dupes.db"
+
+            os.environ["OUTPUT_PATH"] = str(output_path)
+            os.environ["DEDUP_DB_PATH"] = str(dedup_path)
+            os.environ["ENABLE_SENTIMENT"] = "false"
+            os.environ["CSV_DROP_URL"] = "true"
+            os.environ["CSV_CONTENT_MAX_CHARS"] = "10"
+            collector = RedditSentimentCollector()
+            posts = collector._get_dummy_posts()
+
+            collector.save_to_csv(collector.posts_to_dataframe(posts))
+            dataframe_csv = output_path.read_text()
+
+            collector.save_streaming(posts, collector._iter_sentiment(posts))
+
+            assert output_path.read_text() == dataframe_csv
+            df = pd.read_csv(output_path, keep_default_na=False)
+            assert "url" not in df.columns
+            assert df["content"].str.len().max() <= 10
+            assert posts[0]["content"] == collector._get_dummy_posts()[0]["content"]
+
+            # Clean up
+            del os.environ["OUTPUT_PATH"]
+            del os.environ["DEDUP_DB_PATH"]
+            del os.environ["ENABLE_SENTIMENT"]
+            del os.environ["CSV_DROP_URL"]
+            del os.environ["CSV_CONTENT_MAX_CHARS"]
+
     def test_run_method_success(self):
         """Test successful execution of run method."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -144,6 +211,31 @@ class TestRedditSentimentCollector:
             del os.environ["OUTPUT_PATH"]
             del os.environ["DEDUP_DB_PATH"]
 
+    def test_run_keeps_previous_output_without_unique_posts(self):
+        """Test that a run with only duplicate posts keeps the previous CSV."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = Path(temp_dir) / "test_output.csv"
+            dedup_path = Path(temp_dir) / "dupes.db"
+
+            os.environ["OUTPUT_PATH"] = str(output_path)
+            os.environ["DEDUP_DB_PATH"] = str(dedup_path)
+            os.environ["ENABLE_SENTIMENT"] = "false"
+            collector = RedditSentimentCollector()
+
+            collector.run()
+            first_run_csv = output_path.read_text()
+
+            # The dummy posts are all duplicates the second time round
+            collector.run()
+
+            assert output_path.read_text() == first_run_csv
+            assert list(Path(temp_dir).glob("*.tmp")) == []
+
+            # Clean up
+            del os.environ["OUTPUT_PATH"]
+            del os.environ["DEDUP_DB_PATH"]
+            del os.environ["ENABLE_SENTIMENT"]
+
     def test_run_method_with_invalid_path(self):
         """Test run method with invalid output path."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -162,3 +254,21 @@ class TestRedditSentimentCollector:
             # Clean up
             del os.environ["OUTPUT_PATH"]
             del os.environ["DEDUP_DB_PATH"]
+
+
+class TestCollectorManager:
+    """Test cases for CollectorManager."""
+
+    @patch("apps.collector.collector.signal.signal")
+    @patch("apps.collector.collector.RedditSentimentCollector")
+    def test_run_as_service_returns_when_stopped(
+        self, mock_collector_class, mock_signal
+    ):
+        """Test that service mode exits once the stop event is set."""
+        manager = CollectorManager()
+        manager._stop.set()
+
+        manager.run_as_service()
+
+        mock_collector_class.return_value.metrics_server.start.assert_called_once()
+        mock_collector_class.return_value.shutdown.assert_called_once()
@@ -1,10 +1,12 @@
 """Tests for deduplication logic."""
 
+import hashlib
 import os
+import sqlite3
 import tempfile
 from unittest.mock import patch
 
-from apps.collector.dedup import PostDeduplicator
+from apps.collector.dedup import PostDeduplicator, _hash_content, _post_content_bytes
 
 
 class TestPostDeduplicator:
@@ -14,11 +16,9 @@ class TestPostDeduplicator:
         """Test initialization with temporary database."""
         with tempfile.TemporaryDirectory() as temp_dir:
             db_path = f"{temp_dir}/test_dupes.db"
-            dedup = PostDeduplicator(db_path=db_path, capacity=1000)
+            dedup = PostDeduplicator(db_path=db_path)
 
             assert dedup.db_path == db_path
-            assert dedup.capacity == 1000
-            assert dedup.error_rate == 0.1
             assert os.path.exists(db_path)
 
     def test_content_hash_generation(self):
@@ -39,9 +39,9 @@ class TestPostDeduplicator:
             assert hash1 == hash2
             # Different content should produce different hash
             assert hash1 != hash3
-            # Hash should be SHA-256 (64 hex characters)
-            assert len(hash1) == 64
-            assert all(c in "0123456789abcdef" for c in hash1)
+            # Hash should be a raw 16-byte BLAKE3 digest
+            assert isinstance(hash1, bytes)
+            assert len(hash1) == 16
 
     def test_duplicate_detection(self):
         """Test duplicate detection logic."""
@@ -103,6 +103,44 @@ class TestPostDeduplicator:
             assert unique_posts[0]["post_id"] == "post1"
             assert unique_posts[1]["post_id"] == "post2"
 
+    def test_deduplicate_posts_across_batches(self):
+        """Test that a second batch is checked against stored posts."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = f"{temp_dir}/test_dupes.db"
+            dedup = PostDeduplicator(db_path=db_path)
+
+            first_batch = [
+                {
+                    "post_id": "post1",
+                    "title": "Bitcoin rises",
+                    "content": "BTC up 5%",
+                    "subreddit": "Bitcoin",
+                    "created_utc": 1640995200,
+                },
+            ]
+            second_batch = [
+                {
+                    "post_id": "post2",
+                    "title": "Bitcoin rises",  # Duplicate of stored post
+                    "content": "BTC up 5%",
+                    "subreddit": "Bitcoin",
+                    "created_utc": 1640995260,
+                },
+                {
+                    "post_id": "post3",
+                    "title": "Ethereum news",
+                    "content": "ETH news",
+                    "subreddit": "ethereum",
+                    "created_utc": 1640995320,
+                },
+            ]
+
+            assert len(dedup.deduplicate_posts(first_batch)) == 1
+            unique_posts = dedup.deduplicate_posts(second_batch)
+
+            assert [p["post_id"] for p in unique_posts] == ["post3"]
+            assert dedup.get_stats()["total_posts"] == 2
+
     def test_get_stats(self):
         """Test getting deduplication statistics."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -134,7 +172,6 @@ class TestPostDeduplicator:
             assert "ethereum" in stats["by_subreddit"]
             assert stats["by_subreddit"]["Bitcoin"] == 1
             assert stats["by_subreddit"]["ethereum"] == 1
-            assert stats["bloom_filter_capacity"] == dedup.capacity
 
     def test_persistence_across_instances(self):
         """Test that deduplication data persists across instances."""
@@ -158,6 +195,124 @@ class TestPostDeduplicator:
             # Should detect the post as duplicate
             assert dedup2.is_duplicate(post)
 
+    def test_legacy_sha256_hashes_kept_by_post_id(self):
+        """Test that posts with SHA-256 hashes from older databases stay seen."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = f"{temp_dir}/test_dupes.db"
+            post = {
+                "post_id": "legacy1",
+                "title": "Legacy post",
+                "content": "Stored as hex",
+                "subreddit": "Bitcoin",
+                "created_utc": 1640995200,
+            }
+
+            conn = sqlite3.connect(db_path)
+            conn.execute(
+                """
+                CREATE TABLE posts (
+                    post_id TEXT PRIMARY KEY,
+                    content_hash TEXT UNIQUE NOT NULL,
+                    title TEXT NOT NULL,
+                    subreddit TEXT NOT NULL,
+                    created_utc INTEGER NOT NULL,
+                    first_seen_utc INTEGER NOT NULL
+                )
+            """
+            )
+            legacy_hash = hashlib.sha256(b"Legacy post\nStored as hex")
+            conn.executemany(
+                "INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    ("legacy1", legacy_hash.hexdigest(), "Legacy", "", 0, 0),
+                    ("legacy2", legacy_hash.digest(), "Legacy", "", 0, 0),
+                ],
+            )
+            conn.commit()
+            conn.close()
+
+            dedup = PostDeduplicator(db_path=db_path)
+
+            # Legacy hashes leave the posts table but their post IDs are kept
+            assert dedup.get_stats()["total_posts"] == 0
+            assert dedup.is_duplicate(post)
+
+            new_post = {"post_id": "new1", "title": "New post", "content": "Fresh"}
+            assert dedup.deduplicate_posts([post, new_post]) == [new_post]
+
+            # The legacy post is now stored under its BLAKE3 hash
+            assert dedup.get_stats()["total_posts"] == 2
+            legacy_ids = dedup._conn.execute(
+                "SELECT post_id FROM legacy_post_ids"
+            ).fetchall()
+            assert legacy_ids == [("legacy2",)]
+            assert dedup.is_duplicate(post)
+
+    def test_post_id_keyed_schema_migration(self):
+        """Test that old post_id-keyed tables are rebuilt on content_hash."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = f"{temp_dir}/test_dupes.db"
+            post = {"post_id": "old1", "title": "Old post", "subreddit": "Bitcoin"}
+
+            conn = sqlite3.connect(db_path)
+            conn.execute(
+                """
+                CREATE TABLE posts (
+                    post_id TEXT PRIMARY KEY,
+                    content_hash BLOB UNIQUE NOT NULL,
+                    title TEXT NOT NULL,
+                    subreddit TEXT NOT NULL,
+                    created_utc INTEGER NOT NULL,
+                    first_seen_utc INTEGER NOT NULL
+                )
+            """
+            )
+            conn.execute("CREATE INDEX idx_content_hash ON posts(content_hash)")
+            content_hash = _hash_content(_post_content_bytes(post))
+            conn.execute(
+                "INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?)",
+                ("old1", content_hash, "Old post", "Bitcoin", 0, 0),
+            )
+            conn.commit()
+            conn.close()
+
+            dedup = PostDeduplicator(db_path=db_path)
+
+            assert dedup.is_duplicate(post)
+            assert dedup.get_stats()["total_posts"] == 1
+            indexes = dedup._conn.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'idx_content_hash'"
+            ).fetchall()
+            assert indexes == []
+            columns = dedup._conn.execute("PRAGMA table_info(posts)").fetchall()
+            assert [row[1] for row in columns if row[5]] == ["content_hash"]
+
+    def test_get_stats_reuses_connection(self):
+        """Test that stats are read over the deduplicator's own connection."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = f"{temp_dir}/test_dupes.db"
+            dedup = PostDeduplicator(db_path=db_path)
+            dedup.add_post({"post_id": "p1", "title": "First", "subreddit": "Bitcoin"})
+
+            with patch("sqlite3.connect", side_effect=AssertionError):
+                stats = dedup.get_stats()
+
+            assert stats["total_posts"] == 1
+            assert stats["by_subreddit"] == {"Bitcoin": 1}
+
+    def test_close(self):
+        """Test that close releases the connection and is idempotent."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = f"{temp_dir}/test_dupes.db"
+            dedup = PostDeduplicator(db_path=db_path)
+            dedup.deduplicate_posts([{"post_id": "p1", "title": "First"}])
+
+            dedup.close()
+            dedup.close()
+
+            # Data written before close is visible to a new instance
+            assert PostDeduplicator(db_path=db_path).get_stats()["total_posts"] == 1
+
     def test_empty_content_handling(self):
         """Test handling of posts with empty content."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -173,12 +328,28 @@ class TestPostDeduplicator:
             hash2 = dedup._generate_content_hash(post2)
             hash3 = dedup._generate_content_hash(post3)
 
-            assert isinstance(hash1, str)
-            assert isinstance(hash2, str)
-            assert isinstance(hash3, str)
+            assert isinstance(hash1, bytes)
+            assert isinstance(hash2, bytes)
+            assert isinstance(hash3, bytes)
             assert hash1 != hash2
             assert hash2 != hash3
 
+    def test_precomputed_content_hash(self):
+        """Test passing a precomputed hash skips re-hashing the post."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = f"{temp_dir}/test_dupes.db"
+            dedup = PostDeduplicator(db_path=db_path)
+
+            post = {"post_id": "test123", "title": "Title", "content": "Body"}
+            content_hash = dedup._generate_content_hash(post)
+
+            with patch.object(
+                dedup, "_generate_content_hash", side_effect=AssertionError
+            ):
+                assert not dedup.is_duplicate(post, content_hash)
+                dedup.add_post(post, content_hash)
+                assert dedup.is_duplicate(post, content_hash)
+
     def test_missing_fields_handling(self):
         """Test handling of posts with missing fields."""
         with tempfile.TemporaryDirectory() as temp_dir:
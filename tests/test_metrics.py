@@ -59,9 +59,12 @@ class TestPipelineMetrics:
     def test_default_registry_initialization(self):
         """Test metrics initialization with default registry."""
         metrics = PipelineMetrics()
-        # Should use the default REGISTRY, not None
+        # Should use a dedicated registry, not the global REGISTRY
         from prometheus_client import REGISTRY
-        assert metrics.registry is REGISTRY
+        assert isinstance(metrics.registry, CollectorRegistry)
+        assert metrics.registry is not REGISTRY
+        assert PipelineMetrics().registry is not metrics.registry
+        assert 'python_gc_' not in metrics.get_metrics_text()
 
     def test_record_posts_fetched(self):
         """Test recording posts fetched metrics."""
@@ -73,6 +76,18 @@ class TestPipelineMetrics:
         assert 'reddit_posts_fetched_total{subreddit="Bitcoin"} 50.0' in metrics_text
         assert 'reddit_posts_fetched_total{subreddit="ethereum"} 30.0' in metrics_text
 
+    def test_label_children_cached(self):
+        """Test that label children are looked up once per label set."""
+        counter = self.metrics.posts_fetched_total
+        with patch.object(counter, 'labels', wraps=counter.labels) as mock_labels:
+            self.metrics.record_posts_fetched(1, "Bitcoin")
+            self.metrics.record_posts_fetched(2, "Bitcoin")
+            self.metrics.record_posts_fetched(3, "ethereum")
+
+        assert mock_labels.call_count == 2
+        metrics_text = generate_latest(self.registry).decode('utf-8')
+        assert 'reddit_posts_fetched_total{subreddit="Bitcoin"} 3.0' in metrics_text
+
     def test_record_posts_deduplicated(self):
         """Test recording deduplication metrics."""
         self.metrics.record_posts_deduplicated(15)
@@ -109,6 +124,13 @@ class TestPipelineMetrics:
         assert 'sentiment_distribution_total{label="negative"} 5.0' in metrics_text
         assert 'sentiment_distribution_total{label="neutral"} 35.0' in metrics_text
 
+    def test_sentiment_labels_precreated(self):
+        """Test that FinBERT's sentiment labels are exported from the start."""
+        metrics_text = generate_latest(self.registry).decode('utf-8')
+        for label in ("positive", "negative", "neutral"):
+            expected = f'sentiment_distribution_total{{label="{label}"}} 0.0'
+            assert expected in metrics_text
+
     def test_record_error(self):
         """Test error recording and health status update."""
         # Initially healthy
@@ -179,6 +201,19 @@ class TestPipelineMetrics:
         metrics_text = self.metrics.get_metrics_text()
         assert isinstance(metrics_text, str)
         assert 'reddit_posts_fetched_total' in metrics_text
+        assert self.metrics.get_metrics_bytes() == metrics_text.encode('utf-8')
+
+    def test_metrics_text_cached_within_ttl(self):
+        """Test that the exposition is reused until the cache TTL expires."""
+        metrics = PipelineMetrics(registry=CollectorRegistry(), cache_ttl=60)
+        metrics.record_posts_fetched(10, "Bitcoin")
+        first = metrics.get_metrics_text()
+
+        metrics.record_posts_fetched(10, "ethereum")
+        assert metrics.get_metrics_text() == first
+
+        metrics.cache_ttl = 0
+        assert 'subreddit="ethereum"' in metrics.get_metrics_text()
 
     def test_get_content_type(self):
         """Test getting correct content type for metrics."""
@@ -226,6 +261,78 @@ class TestMetricsServer:
         assert callable(server.start)
         assert server.running is False  # Should not be running initially
 
+    def test_start_and_stop_server(self):
+        """Test serving metrics over HTTP and shutting the server down."""
+        import urllib.request
+
+        registry = CollectorRegistry()
+        metrics = PipelineMetrics(registry=registry)
+        metrics.record_posts_fetched(5, "Bitcoin")
+        server = MetricsServer(port=0, metrics=metrics)
+
+        server.start()
+        try:
+            port = server.server.sockets[0].getsockname()[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+                body = resp.read().decode("utf-8")
+            assert 'reddit_posts_fetched_total{subreddit="Bitcoin"} 5.0' in body
+
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health") as resp:
+                assert resp.read() == b'{"status": "healthy"}'
+        finally:
+            server.stop()
+
+        assert server.running is False
+        assert server.server is None
+
+    def test_server_rejects_unknown_paths_and_methods(self):
+        """Test 404/405 responses and body-less HEAD responses."""
+        import http.client
+
+        registry = CollectorRegistry()
+        metrics = PipelineMetrics(registry=registry)
+        server = MetricsServer(port=0, metrics=metrics)
+
+        server.start()
+        try:
+            port = server.server.sockets[0].getsockname()[1]
+
+            def request(method, path):
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                try:
+                    conn.request(method, path)
+                    resp = conn.getresponse()
+                    return resp.status, resp.getheader("Allow"), resp.read()
+                finally:
+                    conn.close()
+
+            assert request("GET", "/nope")[0] == 404
+            assert request("POST", "/metrics")[:2] == (405, "GET, HEAD")
+
+            status, _, body = request("HEAD", "/metrics")
+            assert status == 200
+            assert body == b""
+        finally:
+            server.stop()
+
+    def test_server_drops_idle_clients(self):
+        """Test that a client which never sends a request is disconnected."""
+        import socket
+
+        registry = CollectorRegistry()
+        metrics = PipelineMetrics(registry=registry)
+        server = MetricsServer(port=0, metrics=metrics)
+
+        with patch("apps.collector.metrics.REQUEST_READ_TIMEOUT", 0.2):
+            server.start()
+            try:
+                port = server.server.sockets[0].getsockname()[1]
+                with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+                    # The server closes the connection without a response
+                    assert sock.recv(1024) == b""
+            finally:
+                server.stop()
+
     def test_get_metrics_response(self):
         """Test getting metrics response for manual serving."""
         registry = CollectorRegistry()
@@ -235,8 +342,8 @@ class TestMetricsServer:
         server = MetricsServer(metrics=metrics)
         content, content_type = server.get_metrics_response()
         
-        assert isinstance(content, str)
-        assert 'reddit_posts_fetched_total' in content
+        assert isinstance(content, bytes)
+        assert b'reddit_posts_fetched_total' in content
         assert content_type == 'text/plain; version=0.0.4; charset=utf-8'
 
 
@@ -4,6 +4,8 @@ import os
 import tempfile
 from unittest.mock import Mock, patch
 
+import pandas as pd
+
 from apps.collector.collector import RedditSentimentCollector
 
 
@@ -66,6 +68,8 @@ class TestRedditIntegration:
 
             collector = RedditSentimentCollector()
             assert collector.reddit is not None
+            assert collector.reddit.read_only is True
+            mock_instance.user.me.assert_not_called()
 
             # Clean up
             del os.environ["REDDIT_CLIENT_ID"]
@@ -169,6 +173,108 @@ class TestRedditIntegration:
             del os.environ["OUTPUT_PATH"]
             del os.environ["DEDUP_DB_PATH"]
 
+    @patch("praw.Reddit")
+    def test_fetch_reddit_posts_multiple_subreddits(self, mock_reddit):
+        """Test concurrent fetching keeps subreddit order and skips failures."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+
+            def make_subreddit(name):
+                if name == "dogecoin":
+                    raise Exception("API down")
+                mock_post = Mock()
+                mock_post.id = f"{name}_post"
+                mock_post.title = f"{name} title"
+                mock_post.selftext = ""
+                mock_post.score = 1
+                mock_post.created_utc = 1640995200
+                mock_post.url = f"https://reddit.com/{name}"
+                mock_post.num_comments = 0
+                mock_subreddit = Mock()
+                mock_subreddit.hot.return_value = [mock_post]
+                return mock_subreddit
+
+            mock_instance = Mock()
+            mock_instance.user.me.return_value = None
+            mock_instance.subreddit.side_effect = make_subreddit
+            mock_reddit.return_value = mock_instance
+
+            os.environ["REDDIT_CLIENT_ID"] = "test_id"
+            os.environ["REDDIT_CLIENT_SECRET"] = "test_secret"
+            os.environ["SUBREDDITS"] = "Bitcoin,dogecoin,ethereum"
+            os.environ["OUTPUT_PATH"] = os.path.join(temp_dir, "reddit_sentiment.csv")
+            os.environ["DEDUP_DB_PATH"] = os.path.join(temp_dir, "dupes.db")
+
+            collector = RedditSentimentCollector()
+            posts = collector.fetch_reddit_posts()
+
+            assert [post["post_id"] for post in posts] == [
+                "Bitcoin_post",
+                "ethereum_post",
+            ]
+            assert [post["subreddit"] for post in posts] == ["Bitcoin", "ethereum"]
+
+            # Clean up
+            del os.environ["REDDIT_CLIENT_ID"]
+            del os.environ["REDDIT_CLIENT_SECRET"]
+            del os.environ["SUBREDDITS"]
+            del os.environ["OUTPUT_PATH"]
+            del os.environ["DEDUP_DB_PATH"]
+
+    @patch("praw.Reddit")
+    def test_run_deduplicates_across_subreddit_batches(self, mock_reddit):
+        """Test run() processes subreddit batches and drops cross-posts."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+
+            def make_subreddit(name):
+                cross_post = Mock()
+                cross_post.id = f"{name}_cross"
+                cross_post.title = "Same cross-post"
+                cross_post.selftext = "Posted everywhere"
+                own_post = Mock()
+                own_post.id = f"{name}_own"
+                own_post.title = f"Only in {name}"
+                own_post.selftext = ""
+                for post in (cross_post, own_post):
+                    post.score = 1
+                    post.created_utc = 1640995200
+                    post.url = f"https://reddit.com/{post.id}"
+                    post.num_comments = 0
+                mock_subreddit = Mock()
+                mock_subreddit.hot.return_value = [cross_post, own_post]
+                return mock_subreddit
+
+            mock_instance = Mock()
+            mock_instance.user.me.return_value = None
+            mock_instance.subreddit.side_effect = make_subreddit
+            mock_reddit.return_value = mock_instance
+
+            output_path = os.path.join(temp_dir, "reddit_sentiment.csv")
+            os.environ["REDDIT_CLIENT_ID"] = "test_id"
+            os.environ["REDDIT_CLIENT_SECRET"] = "test_secret"
+            os.environ["SUBREDDITS"] = "Bitcoin,ethereum"
+            os.environ["OUTPUT_PATH"] = output_path
+            os.environ["DEDUP_DB_PATH"] = os.path.join(temp_dir, "dupes.db")
+            os.environ["ENABLE_SENTIMENT"] = "false"
+
+            collector = RedditSentimentCollector()
+            collector.run()
+
+            df = pd.read_csv(output_path)
+            assert list(df["post_id"]) == [
+                "Bitcoin_cross",
+                "Bitcoin_own",
+                "ethereum_own",
+            ]
+            assert set(df["sentiment_label"]) == {"neutral"}
+
+            # Clean up
+            del os.environ["REDDIT_CLIENT_ID"]
+            del os.environ["REDDIT_CLIENT_SECRET"]
+            del os.environ["SUBREDDITS"]
+            del os.environ["OUTPUT_PATH"]
+            del os.environ["DEDUP_DB_PATH"]
+            del os.environ["ENABLE_SENTIMENT"]
+
     def test_posts_to_dataframe(self):
         """Test converting posts list to DataFrame."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -198,6 +304,9 @@ class TestRedditIntegration:
             assert df.iloc[0]["sentiment_label"] == "neutral"
             assert df.iloc[0]["sentiment_score"] == 0.5
             assert df.iloc[0]["run_id"] == collector.run_id
+            assert df["score"].dtype == "int32"
+            assert df["subreddit"].dtype == "category"
+            assert df["sentiment_label"].dtype == "category"
 
             # Clean up
             del os.environ["OUTPUT_PATH"]
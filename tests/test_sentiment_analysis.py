@@ -12,9 +12,31 @@ import unittest.mock
 from unittest import TestCase
 from unittest.mock import MagicMock, Mock, patch
 
+import numpy as np
 import pytest
+import torch
 
-from apps.collector.sentiment import FinBERTSentimentAnalyzer
+from apps.collector.sentiment import (
+    RESULT_FIELDS,
+    FinBERTSentimentAnalyzer,
+    _detect_device,
+)
+
+FINBERT_LABELS = {0: "positive", 1: "negative", 2: "neutral"}
+
+
+def finbert_model(*score_rows):
+    """Build a mock FinBERT model whose forward pass yields score_rows."""
+    model = Mock()
+    model.config.id2label = FINBERT_LABELS
+    if score_rows:
+        model.return_value.logits = torch.log(torch.tensor(score_rows))
+    return model
+
+
+def finbert_tokenizer():
+    """Build a mock tokenizer returning an empty encoding."""
+    return Mock(return_value={})
 
 
 class TestFinBERTSentimentAnalyzer(TestCase):
@@ -22,6 +44,9 @@ class TestFinBERTSentimentAnalyzer(TestCase):
 
     def setUp(self):
         """Set up test fixtures."""
+        # Device detection is cached per process; probe afresh in each test
+        _detect_device.cache_clear()
+        self.addCleanup(_detect_device.cache_clear)
         self.test_texts = [
             "Bitcoin price is soaring to new heights!",
             "The market is crashing, massive losses everywhere",
@@ -34,15 +59,14 @@ class TestFinBERTSentimentAnalyzer(TestCase):
             "label", "confidence", "positive", "negative", "neutral"
         ]
 
-    @patch('apps.collector.sentiment.pipeline')
+    @patch('apps.collector.sentiment.try_to_load_from_cache', return_value=None)
     @patch('apps.collector.sentiment.AutoTokenizer')
     @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
-    def test_init_success(self, mock_model, mock_tokenizer, mock_pipeline):
+    def test_init_success(self, mock_model, mock_tokenizer, mock_cache):
         """Test successful initialization of FinBERT analyzer."""
         # Mock successful model loading
-        mock_tokenizer.from_pretrained.return_value = Mock()
-        mock_model.from_pretrained.return_value = Mock()
-        mock_pipeline.return_value = Mock()
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+        mock_model.from_pretrained.return_value = finbert_model()
         
         analyzer = FinBERTSentimentAnalyzer(
             model_name="ProsusAI/finbert",
@@ -52,13 +76,113 @@ class TestFinBERTSentimentAnalyzer(TestCase):
         self.assertEqual(analyzer.model_name, "ProsusAI/finbert")
         self.assertEqual(analyzer.batch_size, 4)
         self.assertIsNotNone(analyzer.device)
-        mock_tokenizer.from_pretrained.assert_called_once_with("ProsusAI/finbert")
-        mock_model.from_pretrained.assert_called_once_with("ProsusAI/finbert")
+        mock_tokenizer.from_pretrained.assert_called_once_with(
+            "ProsusAI/finbert", use_fast=True, local_files_only=False
+        )
+        mock_model.from_pretrained.assert_called_once_with(
+            "ProsusAI/finbert", local_files_only=False
+        )
+        mock_model.from_pretrained.return_value.eval.assert_called_once_with()
+
+    @patch('apps.collector.sentiment.torch.compile')
+    @patch('apps.collector.sentiment.AutoTokenizer')
+    @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
+    def test_init_with_compile(
+        self, mock_model, mock_tokenizer, mock_compile
+    ):
+        """Test that compile_model compiles and warms up the model."""
+        model = finbert_model([0.8, 0.1, 0.1], [0.8, 0.1, 0.1])
+        eager_forward = model.forward
+        mock_model.from_pretrained.return_value = model
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+
+        analyzer = FinBERTSentimentAnalyzer(batch_size=2, compile_model=True)
 
-    @patch('apps.collector.sentiment.pipeline')
+        mock_compile.assert_called_once_with(
+            eager_forward, mode="reduce-overhead", fullgraph=False
+        )
+        self.assertIs(analyzer.model.forward, mock_compile.return_value)
+        self.assertEqual(
+            analyzer.tokenizer.call_args.args[0], ["warmup", "warmup"]
+        )
+
+    @patch('apps.collector.sentiment.torch.ao.quantization.quantize_dynamic')
     @patch('apps.collector.sentiment.AutoTokenizer')
     @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
-    def test_init_failure(self, mock_model, mock_tokenizer, mock_pipeline):
+    def test_init_with_precision(
+        self, mock_model, mock_tokenizer, mock_quantize
+    ):
+        """Test int8 quantization, bf16 and the fp16 fallback without CUDA."""
+        model = finbert_model()
+        mock_model.from_pretrained.return_value = model
+        mock_quantize.return_value = finbert_model()
+
+        with patch.object(FinBERTSentimentAnalyzer, '_get_device', return_value="cpu"):
+            analyzer = FinBERTSentimentAnalyzer(precision="int8")
+            self.assertIs(analyzer.model, mock_quantize.return_value)
+
+            analyzer = FinBERTSentimentAnalyzer(precision="fp16")
+            self.assertIs(analyzer.model, model)
+            model.half.assert_not_called()
+
+            model.to.return_value.config.id2label = FINBERT_LABELS
+            analyzer = FinBERTSentimentAnalyzer(precision="bf16")
+            model.to.assert_called_once_with(dtype=torch.bfloat16)
+            self.assertIs(analyzer.model, model.to.return_value)
+
+    @patch('apps.collector.sentiment.AutoTokenizer')
+    @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
+    def test_init_with_onnx_int8(self, mock_model, mock_tokenizer):
+        """Test the ONNX Runtime export is cached and loaded on CPU."""
+        ort = MagicMock()
+        ort_config = MagicMock()
+        ort_class = ort.ORTModelForSequenceClassification
+        modules = {
+            'optimum': MagicMock(),
+            'optimum.onnxruntime': ort,
+            'optimum.onnxruntime.configuration': ort_config,
+        }
+
+        cpu_device = patch.object(
+            FinBERTSentimentAnalyzer, '_get_device', return_value="cpu"
+        )
+
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                patch.dict('sys.modules', modules), cpu_device:
+            analyzer = FinBERTSentimentAnalyzer(
+                precision="onnx-int8", onnx_cache_dir=temp_dir
+            )
+
+            cache_dir = os.path.join(temp_dir, "ProsusAI--finbert")
+            ort_class.from_pretrained.assert_any_call("ProsusAI/finbert", export=True)
+            ort.ORTQuantizer.from_pretrained.return_value.quantize.assert_called_once()
+            ort_class.from_pretrained.assert_called_with(
+                unittest.mock.ANY, file_name="model_quantized.onnx"
+            )
+            self.assertEqual(
+                str(ort_class.from_pretrained.call_args.args[0]), cache_dir
+            )
+            self.assertIs(analyzer.model, ort_class.from_pretrained.return_value)
+            mock_model.from_pretrained.assert_not_called()
+
+    @patch('apps.collector.sentiment.AutoTokenizer')
+    @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
+    def test_init_with_onnx_int8_without_optimum(
+        self, mock_model, mock_tokenizer
+    ):
+        """Test onnx-int8 falls back to the PyTorch model without optimum."""
+        cpu_device = patch.object(
+            FinBERTSentimentAnalyzer, '_get_device', return_value="cpu"
+        )
+
+        with patch.dict('sys.modules', {'optimum.onnxruntime': None}), cpu_device:
+            analyzer = FinBERTSentimentAnalyzer(precision="onnx-int8")
+
+        self.assertIs(analyzer.model, mock_model.from_pretrained.return_value)
+
+    @patch('apps.collector.sentiment.AutoTokenizer')
+    @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
+    def test_init_failure(self, mock_model, mock_tokenizer):
         """Test initialization failure handling."""
         # Mock model loading failure
         mock_tokenizer.from_pretrained.side_effect = Exception("Model not found")
@@ -82,28 +206,69 @@ class TestFinBERTSentimentAnalyzer(TestCase):
         result = analyzer._preprocess_text(None)
         self.assertEqual(result, "")
         
-        # Test very long text (should be truncated to 400 chars max)
+        # Test very long text (left whole, the tokenizer truncates it)
         long_text = "Bitcoin " * 1000
         result = analyzer._preprocess_text(long_text)
-        self.assertTrue(len(result) <= 400)  # Should be truncated to 400 chars
+        self.assertEqual(result, long_text.strip())
 
-    @patch('apps.collector.sentiment.pipeline')
+    def test_preprocess_batch(self):
+        """Test batch preprocessing keeps positions for invalid texts."""
+        result = FinBERTSentimentAnalyzer._preprocess_batch(
+            ["  Bitcoin  ", "", None, "x" * 1000]
+        )
+        self.assertEqual(result[:3], ["Bitcoin", "", ""])
+        self.assertEqual(len(result[3]), 1000)
+
+    @patch('apps.collector.sentiment.try_to_load_from_cache')
+    @patch('apps.collector.sentiment.AutoTokenizer')
+    @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
+    def test_init_from_local_cache(self, mock_model, mock_tokenizer, mock_cache):
+        """Test that a cached model loads without contacting the Hub."""
+        mock_cache.return_value = "/cache/models--ProsusAI--finbert/config.json"
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+        mock_model.from_pretrained.return_value = finbert_model()
+
+        FinBERTSentimentAnalyzer()
+
+        mock_cache.assert_called_once_with("ProsusAI/finbert", "config.json")
+        self.assertTrue(
+            mock_tokenizer.from_pretrained.call_args.kwargs["local_files_only"]
+        )
+        self.assertTrue(mock_model.from_pretrained.call_args.kwargs["local_files_only"])
+
+    @patch('apps.collector.sentiment.try_to_load_from_cache')
     @patch('apps.collector.sentiment.AutoTokenizer')
     @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
-    def test_analyze_sentiment_success(self, mock_model, mock_tokenizer, mock_pipeline):
+    def test_init_from_partial_cache(self, mock_model, mock_tokenizer, mock_cache):
+        """Test that a partially cached model is completed from the Hub."""
+        mock_cache.return_value = "/cache/models--ProsusAI--finbert/config.json"
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+        model = finbert_model()
+        mock_model.from_pretrained.side_effect = [OSError("no weights"), model]
+
+        analyzer = FinBERTSentimentAnalyzer()
+
+        self.assertIs(analyzer.model, model)
+        calls = mock_model.from_pretrained.call_args_list
+        self.assertEqual([c.kwargs["local_files_only"] for c in calls], [True, False])
+
+    @patch('apps.collector.sentiment.AutoTokenizer')
+    @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
+    def test_init_requires_fast_tokenizer(self, mock_model, mock_tokenizer):
+        """Test that a checkpoint without a fast tokenizer fails to load."""
+        mock_tokenizer.from_pretrained.return_value.is_fast = False
+
+        with self.assertRaises(ValueError):
+            FinBERTSentimentAnalyzer()
+        mock_model.from_pretrained.assert_not_called()
+
+    @patch('apps.collector.sentiment.AutoTokenizer')
+    @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
+    def test_analyze_sentiment_success(self, mock_model, mock_tokenizer):
         """Test successful sentiment analysis of single text."""
         # Mock model components
-        mock_tokenizer.from_pretrained.return_value = Mock()
-        mock_model.from_pretrained.return_value = Mock()
-        
-        # Mock pipeline response
-        mock_pipeline_instance = Mock()
-        mock_pipeline_instance.return_value = [[
-            {"label": "positive", "score": 0.8},
-            {"label": "negative", "score": 0.1},
-            {"label": "neutral", "score": 0.1}
-        ]]
-        mock_pipeline.return_value = mock_pipeline_instance
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+        mock_model.from_pretrained.return_value = finbert_model([0.8, 0.1, 0.1])
         
         analyzer = FinBERTSentimentAnalyzer()
         result = analyzer.analyze_sentiment("Bitcoin price is rising!")
@@ -113,15 +278,15 @@ class TestFinBERTSentimentAnalyzer(TestCase):
             self.assertIn(key, result)
         
         self.assertEqual(result["label"], "positive")
-        self.assertEqual(result["confidence"], 0.8)
-        self.assertEqual(result["positive"], 0.8)
-        self.assertEqual(result["negative"], 0.1)
-        self.assertEqual(result["neutral"], 0.1)
+        self.assertAlmostEqual(result["confidence"], 0.8, places=5)
+        self.assertAlmostEqual(result["positive"], 0.8, places=5)
+        self.assertAlmostEqual(result["negative"], 0.1, places=5)
+        self.assertAlmostEqual(result["neutral"], 0.1, places=5)
 
     def test_analyze_sentiment_no_model(self):
         """Test sentiment analysis when model is not loaded."""
         analyzer = FinBERTSentimentAnalyzer.__new__(FinBERTSentimentAnalyzer)
-        analyzer.pipeline = None
+        analyzer.model = None
         
         result = analyzer.analyze_sentiment("Test text")
         
@@ -132,19 +297,15 @@ class TestFinBERTSentimentAnalyzer(TestCase):
         self.assertAlmostEqual(result["negative"], 0.33, places=2)
         self.assertAlmostEqual(result["neutral"], 0.34, places=2)
 
-    @patch('apps.collector.sentiment.pipeline')
     @patch('apps.collector.sentiment.AutoTokenizer')
     @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
-    def test_analyze_sentiment_error(self, mock_model, mock_tokenizer, mock_pipeline):
+    def test_analyze_sentiment_error(self, mock_model, mock_tokenizer):
         """Test sentiment analysis error handling."""
         # Mock model components
-        mock_tokenizer.from_pretrained.return_value = Mock()
-        mock_model.from_pretrained.return_value = Mock()
-        
-        # Mock pipeline that raises an error
-        mock_pipeline_instance = Mock()
-        mock_pipeline_instance.side_effect = Exception("Analysis failed")
-        mock_pipeline.return_value = mock_pipeline_instance
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+        model = finbert_model()
+        model.side_effect = Exception("Analysis failed")
+        mock_model.from_pretrained.return_value = model
         
         analyzer = FinBERTSentimentAnalyzer()
         result = analyzer.analyze_sentiment("Test text")
@@ -153,30 +314,15 @@ class TestFinBERTSentimentAnalyzer(TestCase):
         self.assertEqual(result["label"], "neutral")
         self.assertEqual(result["confidence"], 0.5)
 
-    @patch('apps.collector.sentiment.pipeline')
     @patch('apps.collector.sentiment.AutoTokenizer')
     @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
-    def test_analyze_batch_success(self, mock_model, mock_tokenizer, mock_pipeline):
+    def test_analyze_batch_success(self, mock_model, mock_tokenizer):
         """Test successful batch sentiment analysis."""
         # Mock model components
-        mock_tokenizer.from_pretrained.return_value = Mock()
-        mock_model.from_pretrained.return_value = Mock()
-        
-        # Mock batch pipeline response
-        mock_pipeline_instance = Mock()
-        mock_pipeline_instance.return_value = [
-            [
-                {"label": "positive", "score": 0.8},
-                {"label": "negative", "score": 0.1},
-                {"label": "neutral", "score": 0.1}
-            ],
-            [
-                {"label": "negative", "score": 0.7},
-                {"label": "positive", "score": 0.2},
-                {"label": "neutral", "score": 0.1}
-            ]
-        ]
-        mock_pipeline.return_value = mock_pipeline_instance
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+        mock_model.from_pretrained.return_value = finbert_model(
+            [0.8, 0.1, 0.1], [0.2, 0.7, 0.1]
+        )
         
         analyzer = FinBERTSentimentAnalyzer()
         texts = ["Great news!", "Bad news!"]
@@ -186,16 +332,16 @@ class TestFinBERTSentimentAnalyzer(TestCase):
         
         # Check first result
         self.assertEqual(results[0]["label"], "positive")
-        self.assertEqual(results[0]["confidence"], 0.8)
+        self.assertAlmostEqual(results[0]["confidence"], 0.8, places=5)
         
         # Check second result
         self.assertEqual(results[1]["label"], "negative")
-        self.assertEqual(results[1]["confidence"], 0.7)
+        self.assertAlmostEqual(results[1]["confidence"], 0.7, places=5)
 
     def test_analyze_batch_no_model(self):
         """Test batch analysis when model is not loaded."""
         analyzer = FinBERTSentimentAnalyzer.__new__(FinBERTSentimentAnalyzer)
-        analyzer.pipeline = None
+        analyzer.model = None
         
         texts = ["Text 1", "Text 2"]
         results = analyzer.analyze_batch(texts)
@@ -205,25 +351,20 @@ class TestFinBERTSentimentAnalyzer(TestCase):
             self.assertEqual(result["label"], "neutral")
             self.assertEqual(result["confidence"], 0.5)
 
-    @patch('apps.collector.sentiment.pipeline')
+        # Fallback results are plain dicts, independent of each other
+        self.assertIs(type(results[0]), dict)
+        results[0]["label"] = "positive"
+        self.assertEqual(results[1]["label"], "neutral")
+        self.assertEqual(analyzer.analyze_batch(texts)[0]["label"], "neutral")
+
     @patch('apps.collector.sentiment.AutoTokenizer')
     @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
-    def test_analyze_batch_with_empty_texts(self, mock_model, mock_tokenizer, mock_pipeline):
+    def test_analyze_batch_with_empty_texts(self, mock_model, mock_tokenizer):
         """Test batch analysis with empty and None texts."""
         # Mock model components
-        mock_tokenizer.from_pretrained.return_value = Mock()
-        mock_model.from_pretrained.return_value = Mock()
-        
-        # Mock pipeline response for valid text
-        mock_pipeline_instance = Mock()
-        mock_pipeline_instance.return_value = [
-            [
-                {"label": "positive", "score": 0.8},
-                {"label": "negative", "score": 0.1},
-                {"label": "neutral", "score": 0.1}
-            ]
-        ]
-        mock_pipeline.return_value = mock_pipeline_instance
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+        # Model response for the single valid text
+        mock_model.from_pretrained.return_value = finbert_model([0.8, 0.1, 0.1])
         
         analyzer = FinBERTSentimentAnalyzer()
         texts = ["", "Valid text", None, "  "]  # Mix of empty and valid texts
@@ -239,15 +380,45 @@ class TestFinBERTSentimentAnalyzer(TestCase):
         # Valid text should get analyzed result
         self.assertEqual(results[1]["label"], "positive")
 
-    @patch('apps.collector.sentiment.pipeline')
     @patch('apps.collector.sentiment.AutoTokenizer')
     @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
-    def test_get_model_info(self, mock_model, mock_tokenizer, mock_pipeline):
+    def test_analyze_batch_arrays(self, mock_model, mock_tokenizer):
+        """Test batch analysis returning one array per result field."""
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+        mock_model.from_pretrained.return_value = finbert_model(
+            [0.1, 0.2, 0.7], [0.2, 0.7, 0.1]
+        )
+
+        analyzer = FinBERTSentimentAnalyzer()
+        arrays = analyzer.analyze_batch_arrays(["Flat", "", "Bad news!"])
+
+        self.assertEqual(tuple(arrays), RESULT_FIELDS)
+        self.assertEqual(arrays["label"].tolist(), ["neutral", "neutral", "negative"])
+        np.testing.assert_allclose(arrays["confidence"], [0.7, 0.5, 0.7], rtol=1e-5)
+        np.testing.assert_allclose(arrays["positive"], [0.1, 0.33, 0.2], rtol=1e-5)
+        np.testing.assert_allclose(arrays["neutral"], [0.7, 0.34, 0.1], rtol=1e-5)
+
+    @patch('apps.collector.sentiment.AutoTokenizer')
+    @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
+    def test_analyze_batch_arrays_long_labels(self, mock_model, mock_tokenizer):
+        """Test that labels longer than "neutral" are not truncated."""
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+        model = finbert_model([0.1, 0.2, 0.7])
+        model.config.id2label = {0: "positive", 1: "negative", 2: "very_bearish"}
+        mock_model.from_pretrained.return_value = model
+
+        analyzer = FinBERTSentimentAnalyzer()
+        arrays = analyzer.analyze_batch_arrays(["", "Crash incoming"])
+
+        self.assertEqual(arrays["label"].tolist(), ["neutral", "very_bearish"])
+
+    @patch('apps.collector.sentiment.AutoTokenizer')
+    @patch('apps.collector.sentiment.AutoModelForSequenceClassification')
+    def test_get_model_info(self, mock_model, mock_tokenizer):
         """Test getting model information."""
         # Mock model components
-        mock_tokenizer.from_pretrained.return_value = Mock()
-        mock_model.from_pretrained.return_value = Mock()
-        mock_pipeline.return_value = Mock()
+        mock_tokenizer.from_pretrained.return_value = finbert_tokenizer()
+        mock_model.from_pretrained.return_value = finbert_model()
         
         analyzer = FinBERTSentimentAnalyzer(
             model_name="test/model",
@@ -267,7 +438,7 @@ class TestFinBERTSentimentAnalyzer(TestCase):
         analyzer.model_name = "test/model"
         analyzer.batch_size = 8
         analyzer.device = "cpu"
-        analyzer.pipeline = None
+        analyzer.model = None
         
         info = analyzer.get_model_info()
         
@@ -306,6 +477,17 @@ class TestFinBERTSentimentAnalyzer(TestCase):
         
         self.assertEqual(device, "cpu")
 
+    @patch('apps.collector.sentiment.torch')
+    def test_device_detection_cached(self, mock_torch):
+        """Test that device detection is probed once per process."""
+        mock_torch.cuda.is_available.return_value = True
+
+        analyzer = FinBERTSentimentAnalyzer.__new__(FinBERTSentimentAnalyzer)
+        self.assertEqual(analyzer._get_device(), "cuda")
+        self.assertEqual(analyzer._get_device(), "cuda")
+
+        mock_torch.cuda.is_available.assert_called_once_with()
+
 
 class TestSentimentIntegration(TestCase):
     """Test sentiment analysis integration with collector."""
@@ -316,7 +498,7 @@ class TestSentimentIntegration(TestCase):
             {
                 "post_id": "test_1",
                 "title": "Bitcoin reaches new all-time high!",
-                "content": "Incredible bull run continues",
+                "content": "Bull run continues",
                 "score": 500,
                 "created_utc": 1640995200,
                 "subreddit": "Bitcoin",
@@ -336,24 +518,31 @@ class TestSentimentIntegration(TestCase):
         """Test sentiment analysis integration in collector."""
         from apps.collector.collector import RedditSentimentCollector
 
-        # Mock analyzer instance
-        mock_analyzer = Mock()
-        mock_analyzer.analyze_batch.return_value = [
-            {
+        # Mock analyzer instance; results are keyed by text so the test also
+        # checks they are mapped back to the right post
+        results_by_title = {
+            "Bitcoin": {
                 "label": "positive",
                 "confidence": 0.85,
                 "positive": 0.85,
                 "negative": 0.10,
                 "neutral": 0.05
             },
-            {
-                "label": "negative", 
+            "Market": {
+                "label": "negative",
                 "confidence": 0.75,
                 "positive": 0.15,
                 "negative": 0.75,
                 "neutral": 0.10
-            }
-        ]
+            },
+        }
+        mock_analyzer = Mock()
+        mock_analyzer.analyze_batch_arrays.side_effect = lambda texts: {
+            field: np.array(
+                [results_by_title[text.split()[0]][field] for text in texts]
+            )
+            for field in RESULT_FIELDS
+        }
         mock_analyzer_class.return_value = mock_analyzer
         
         # Create collector with mocked Reddit client
@@ -388,8 +577,22 @@ class TestSentimentIntegration(TestCase):
             self.assertEqual(df.iloc[1]['sentiment_label'], 'negative')
             self.assertEqual(df.iloc[1]['sentiment_confidence'], 0.75)
             
-            # Verify analyzer was called
-            mock_analyzer.analyze_batch.assert_called_once()
+            # Verify analyzer was called with combined title and content,
+            # shortest text first
+            mock_analyzer.analyze_batch_arrays.assert_called_once_with([
+                "Bitcoin reaches new all-time high!. Bull run continues",
+                "Market crash imminent. All indicators point to massive correction",
+            ])
+
+            # Longer post first: texts are still sent shortest first and the
+            # results are mapped back to the original post order
+            df = collector.posts_to_dataframe(self.test_posts[::-1])
+            self.assertEqual(
+                mock_analyzer.analyze_batch_arrays.call_args[0][0][0],
+                "Bitcoin reaches new all-time high!. Bull run continues",
+            )
+            self.assertEqual(df.iloc[0]['sentiment_label'], 'negative')
+            self.assertEqual(df.iloc[1]['sentiment_label'], 'positive')
 
     def test_collector_sentiment_disabled(self):
         """Test collector behavior when sentiment analysis is disabled."""